@@ -0,0 +1,96 @@
+"""
+Open-to-visible latency of the browser window: the old create_window() +
+start() per request versus the persistent browser service, with and without
+prefetch. Latency is measured until the page's `loaded` event.
+
+Needs a display. Run from the project root:
+    python -m benchmarks.bench_browser --repeats 3
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import browser
+
+
+URLS = [
+    "https://www.google.com/maps/search/?api=1&query=United+Hospital+Dhaka+Bangladesh",
+    "https://www.google.com/search?q=nearest+police+station",
+    "https://www.google.com/maps/search/?api=1&query=Dhaka+Medical+College+Hospital+Dhaka+Bangladesh",
+]
+
+# what browser.open used to do for every request. It ran in the robot process,
+# where webview was already imported, so the clock starts after the import:
+# interpreter start-up and `import webview` are not part of the old cost
+LEGACY = """
+import sys, time, webview
+print(time.monotonic(), flush=True)
+window = webview.create_window("", sys.argv[1], fullscreen=False)
+def loaded():
+    print(time.monotonic(), flush=True)
+    window.destroy()
+window.events.loaded += loaded
+webview.start()
+"""
+
+
+def legacy_open(url):
+    out = subprocess.run([sys.executable, "-c", LEGACY, url], capture_output=True, text=True, check=True)
+    # CLOCK_MONOTONIC is system wide, so both stamps are comparable
+    requested, loaded = (float(t) for t in out.stdout.split()[:2])
+    return loaded - requested
+
+
+def wait_for_stats(count, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        latencies = browser.stats()
+        if len(latencies) >= count:
+            return latencies
+        time.sleep(0.1)
+    raise TimeoutError("browser service did not report the page as loaded")
+
+
+def report(name, latencies):
+    ms = np.asarray(latencies) * 1000
+    print(f"{name:<28} n={len(ms):<3} p50={np.percentile(ms, 50):8.1f} ms  max={ms.max():8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    urls = URLS * args.repeats
+
+    report("legacy create+start", [legacy_open(url) for url in urls])
+
+    browser.start()
+    browser.wait_ready()  # start-up is paid once per boot
+    seen = 0
+
+    for url in urls:
+        browser.open(url)
+        seen += 1
+        wait_for_stats(seen)
+        browser.hide()
+    report("service", browser.stats()[-len(urls):])
+
+    for url in urls:
+        browser.prefetch(url)
+        time.sleep(3)  # the kiosk prefetches while the user is still talking
+        browser.open(url)
+        seen += 1
+        wait_for_stats(seen)
+        browser.hide()
+    report("service + prefetch", browser.stats()[-len(urls):])
+
+    browser.end()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Recall@1 versus latency for the InfoResponder index types.
+
+Builds a synthetic knowledge base (clustered unit vectors with the MiniLM
+embedding size) and compares every index type against the exact flat search.
+Queries are issued one at a time, the way nlp.run does.
+
+Run from the project root:
+    python -m benchmarks.bench_faiss_index --rows 100000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+import faiss_index
+
+
+DIM = 384  # all-MiniLM-L6-v2
+
+# (index type, build kwargs, list of search-time settings to sweep)
+CONFIGS = [
+    ("flat", {}, [{}]),
+    ("ip", {}, [{}]),
+    ("ivf", {}, [{"nprobe": p} for p in (1, 4, 8, 16, 64)]),
+    ("hnsw", {"hnsw_m": 32}, [{"ef_search": ef} for ef in (16, 32, 64, 128)]),
+]
+
+
+def synthetic_kb(rows, clusters, seed=0):
+    # sentence embeddings are far from uniform: questions about the same topic
+    # sit close together, so draw keys around a set of topic centres
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, DIM)).astype('float32')
+    keys = centres[rng.integers(0, clusters, rows)] + 0.35 * rng.normal(size=(rows, DIM)).astype('float32')
+    keys /= np.linalg.norm(keys, axis=1, keepdims=True)
+    return keys
+
+
+def make_queries(keys, count, noise, seed=1):
+    # a query is a paraphrase of some key: the key plus a small perturbation
+    rng = np.random.default_rng(seed)
+    picked = keys[rng.integers(0, len(keys), count)]
+    queries = picked + noise * rng.normal(size=picked.shape).astype('float32')
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return queries
+
+
+def timed_search(index, index_type, queries):
+    found = np.empty(len(queries), dtype='int64')
+    latencies = np.empty(len(queries))
+    for i, q in enumerate(queries):
+        start = time.perf_counter()
+        _, I = faiss_index.search(index, q[None, :], index_type, k=1)
+        latencies[i] = time.perf_counter() - start
+        found[i] = I[0][0]
+    return found, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=0.05)
+    args = parser.parse_args()
+
+    print(f"Building synthetic knowledge base: {args.rows} rows x {DIM} dims")
+    keys = synthetic_kb(args.rows, args.clusters)
+    queries = make_queries(keys, args.queries, args.noise)
+
+    exact = faiss_index.build_index(keys, "flat")
+    truth, _ = timed_search(exact, "flat", queries)
+
+    print(f"\n{'index':<6} {'params':<16} {'build s':>8} {'recall@1':>9} {'p50 ms':>8} {'p95 ms':>8} {'qps':>8}")
+    for index_type, build_kwargs, sweeps in CONFIGS:
+        start = time.perf_counter()
+        index = faiss_index.build_index(keys, index_type, **build_kwargs)
+        build_s = time.perf_counter() - start
+
+        for params in sweeps:
+            faiss_index.set_search_params(index, **params)
+            found, latencies = timed_search(index, index_type, queries)
+
+            recall = float(np.mean(found == truth))
+            p50, p95 = np.percentile(latencies, [50, 95]) * 1000
+            qps = len(queries) / latencies.sum()
+            label = ",".join(f"{k}={v}" for k, v in params.items()) or "-"
+            print(f"{index_type:<6} {label:<16} {build_s:>8.2f} {recall:>9.4f} {p50:>8.3f} {p95:>8.3f} {qps:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
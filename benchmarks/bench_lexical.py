@@ -0,0 +1,96 @@
+"""
+Hit rate, latency saved and agreement of the lexical fast path in nlp.resolve.
+
+Every utterance of the training dataset goes through both the neural path
+(classifier + faiss) and the lexical index. For the utterances the lexical
+index answers, the intent and response are compared with the neural ones.
+Dispatchers are not run, so no browser windows are opened. A hit always skips
+the faiss search; it skips the classifier only when the key isn't shared by
+intents that behave differently, so that rate is reported separately.
+
+Run from the project root:
+    python -m benchmarks.bench_lexical --limit 2000
+"""
+
+import argparse
+import csv
+import time
+
+import nlp
+
+
+DATASET_PATH = "./datasets/train/motif_dataset_large.csv"
+
+
+def neural(text):
+    tp = nlp.MODEL.predict(text)
+    return tp, nlp.RESPONDERS[tp].respond(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=0, help="only use the first N rows (0 = all)")
+    args = parser.parse_args()
+
+    with open(DATASET_PATH, newline='', encoding='utf-8') as f:
+        rows = [(r["text"], r["label"]) for r in csv.DictReader(f)]
+    if args.limit:
+        rows = rows[:args.limit]
+
+    nlp.USE_LEXICAL = True
+    classify = nlp.MODEL.classify
+    classified = [0]
+
+    def counting_classify(X):
+        classified[0] += 1
+        return classify(X)
+    neural_s = 0.0
+    fast_s = 0.0
+    hit_neural_s = 0.0
+    hits = 0
+    classifier_skips = 0
+    intent_agree = 0
+    response_agree = 0
+    neural_correct = 0
+    fast_correct = 0
+
+    for text, label in rows:
+        start = time.perf_counter()
+        n_tp, n_resp = neural(text)
+        n_elapsed = time.perf_counter() - start
+        neural_s += n_elapsed
+
+        hits_before = nlp.LEXICAL.hits
+        classified_before = classified[0]
+        nlp.MODEL.classify = counting_classify
+        start = time.perf_counter()
+        f_tp, f_resp = nlp.resolve(text)
+        fast_s += time.perf_counter() - start
+        nlp.MODEL.classify = classify
+
+        if nlp.LEXICAL.hits == hits_before:
+            continue
+        hits += 1
+        classifier_skips += classified[0] == classified_before
+        hit_neural_s += n_elapsed
+        intent_agree += f_tp == n_tp
+        response_agree += f_resp == n_resp
+        neural_correct += n_tp == label
+        fast_correct += f_tp == label
+
+    total = len(rows)
+    print(f"utterances        : {total}")
+    print(f"fast path hits    : {hits} ({hits / total:.1%})")
+    if hits:
+        print(f"classifier skipped: {classifier_skips} ({classifier_skips / hits:.1%} of hits)")
+        # shared keys answered without the classifier report the first intent that has them
+        print(f"intent agreement  : {intent_agree / hits:.2%} (on hits)")
+        print(f"response agreement: {response_agree / hits:.2%} (on hits)")
+        print(f"label accuracy    : neural {neural_correct / hits:.2%}, fast {fast_correct / hits:.2%} (on hits)")
+    print(f"mean latency      : neural {neural_s / total * 1000:.3f} ms, with fast path {fast_s / total * 1000:.3f} ms")
+    print(f"time saved        : {(neural_s - fast_s) * 1000:.1f} ms total, "
+          f"{(hit_neural_s / hits * 1000) if hits else 0:.3f} ms neural cost per hit")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Skip ratio, YOLO time saved and staleness of cv_cam's motion gate.
+
+Replays the datasets/test images as a 5 FPS stream in which each scene is held
+for a while (with simulated sensor noise) before cutting to the next. Every
+frame is also detected without the gate; a frame is stale when the gated
+detections (possibly reused) don't match the fresh ones by class and IoU.
+
+Run from the project root:
+    python -m benchmarks.bench_motion_gate --hold 25 --cycles 3
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks import fakes
+
+
+FPS = 5
+IOU_MATCH = 0.5
+
+
+def detections(frame_detections):
+    return [(d['name'], (d['xmin'], d['ymin'], d['xmax'], d['ymax'])) for d in frame_detections]
+
+
+def iou(a, b):
+    ix = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union else 0.0
+
+
+def same(dets_a, dets_b):
+    if len(dets_a) != len(dets_b):
+        return False
+    unmatched = list(dets_b)
+    for name, box in dets_a:
+        match = next((d for d in unmatched if d[0] == name and iou(d[1], box) >= IOU_MATCH), None)
+        if match is None:
+            return False
+        unmatched.remove(match)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hold", type=int, default=25, help="frames each scene stays static")
+    parser.add_argument("--cycles", type=int, default=3)
+    parser.add_argument("--noise", type=float, default=4.0, help="sensor noise (std of gray levels)")
+    args = parser.parse_args()
+
+    fakes.install(camera_fps=30)
+    import cv_cam
+
+    scenes = fakes.FakeVideoCapture().frames
+    rng = np.random.default_rng(0)
+    gate = cv_cam.MotionGate()
+
+    frames = 0
+    stale = 0
+    fresh_s = 0.0
+    gated_s = 0.0
+    gate_s = 0.0
+    gated = []
+    for cycle in range(args.cycles):
+        for scene in scenes:
+            for _ in range(args.hold):
+                frame = np.clip(scene + rng.normal(0, args.noise, scene.shape), 0, 255).astype(np.uint8)
+                now = frames / FPS
+
+                start = time.perf_counter()
+                fresh = detections(cv_cam.model.detect([frame])[0])
+                elapsed = time.perf_counter() - start
+                fresh_s += elapsed
+
+                start = time.perf_counter()
+                changed = gate.should_detect(frame, now)
+                gate_s += time.perf_counter() - start
+                if changed:
+                    gated = fresh
+                    gated_s += elapsed
+
+                stale += not same(gated, fresh)
+                frames += 1
+
+    print(f"frames            : {frames} ({len(scenes)} scenes x {args.hold} frames x {args.cycles} cycles)")
+    print(f"skip ratio        : {gate.skip_ratio():.1%}")
+    print(f"YOLO time         : {fresh_s:.2f} s ungated, {gated_s:.2f} s gated "
+          f"(+{gate_s * 1000:.1f} ms in the gate), {1 - (gated_s + gate_s) / fresh_s:.1%} saved")
+    print(f"stale frames      : {stale} ({stale / frames:.2%})")
+
+    cv_cam.end()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Cost per frame of one batched YOLO forward pass over N camera frames versus
+N separate passes, using the trash.pt model and the datasets/test images.
+
+Run from the project root:
+    python -m benchmarks.bench_multicam --cameras 4
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks import fakes
+
+
+def timed(fn, repeats):
+    fn()  # warm up
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cameras", type=int, default=4)
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    fakes.install(camera_fps=30)
+    import cv_cam
+
+    test_images = fakes.FakeVideoCapture().frames
+    frames = [test_images[i % len(test_images)] for i in range(args.cameras)]
+
+    print(f"{'cameras':>7} {'sequential ms/frame':>20} {'batched ms/frame':>17} {'efficiency':>11}")
+    for n in range(1, args.cameras + 1):
+        batch = frames[:n]
+        sequential = timed(lambda: [cv_cam.model.detect([frame]) for frame in batch], args.repeats)
+        batched = timed(lambda: cv_cam.model.detect(batch), args.repeats)
+        print(f"{n:>7} {sequential / n * 1000:>20.1f} {batched / n * 1000:>17.1f} {sequential / batched:>10.2f}x")
+
+    cv_cam.end()
+
+
+if __name__ == "__main__":
+    main()
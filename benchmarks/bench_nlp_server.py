@@ -0,0 +1,77 @@
+"""
+Throughput and latency of the NLP service (nlp_server.py) with 1-16 concurrent
+clients, with micro-batching and with batching disabled (--max-batch 1).
+
+Each client is a thread with its own connection that sends utterances from the
+training dataset one after another. resolve() is used rather than run() so the
+dispatchers don't open browser windows.
+
+Run from the project root:
+    python -m benchmarks.bench_nlp_server --requests 40 --clients 1,2,4,8,16
+"""
+
+import argparse
+import threading
+import time
+
+import numpy as np
+
+import nlp_server
+from benchmarks.suite import dataset_utterances
+
+
+def load(texts, clients, requests):
+    latencies = []
+    lock = threading.Lock()
+
+    def client(offset):
+        own = []
+        for i in range(requests):
+            start = time.perf_counter()
+            nlp_server.resolve(texts[(offset + i) % len(texts)])
+            own.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=client, args=(c * requests,)) for c in range(clients)]
+    wall_start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, time.perf_counter() - wall_start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", default="1,2,4,8,16")
+    parser.add_argument("--requests", type=int, default=40, help="per client")
+    parser.add_argument("--window", type=float, default=nlp_server.BATCH_WINDOW)
+    args = parser.parse_args()
+
+    counts = [int(c) for c in args.clients.split(",")]
+    texts = dataset_utterances(max(counts) * args.requests)
+
+    for label, max_batch in (("unbatched", 1), ("batched", nlp_server.MAX_BATCH)):
+        nlp_server.start(window=args.window, max_batch=max_batch)
+        nlp_server.wait_ready()
+        nlp_server.resolve(texts[0])  # warm up
+
+        print(f"\n{label} (max batch {max_batch})")
+        print(f"{'clients':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'mean batch':>11}")
+        for clients in counts:
+            before = nlp_server.stats()["resolve"]
+            latencies, wall_s = load(texts, clients, args.requests)
+            after = nlp_server.stats()["resolve"]
+
+            batches = after["batches"] - before["batches"]
+            mean_batch = (after["requests"] - before["requests"]) / batches if batches else 0.0
+            p50, p95, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 95, 99])
+            print(f"{clients:>7} {len(latencies) / wall_s:>8.1f} {p50:>8.1f} {p95:>8.1f} {p99:>8.1f} "
+                  f"{mean_batch:>11.2f}")
+
+        nlp_server.end()
+
+
+if __name__ == "__main__":
+    main()
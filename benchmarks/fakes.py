@@ -0,0 +1,230 @@
+"""
+Fake camera, microphone and serial port for running the robot modules on a dev box.
+
+install() patches cv2.VideoCapture, sounddevice.RawInputStream and
+serial.Serial, so it has to be called before cv_cam, speech_recognition or
+communicator are imported:
+
+    from benchmarks import fakes
+    fakes.install(wav="utterances.wav")
+    import cv_cam
+"""
+
+import glob
+import os
+import pty
+import threading
+import time
+import tty
+import wave
+
+import cv2
+import numpy as np
+
+
+IMAGES_DIR = "./datasets/test"
+FRAME_SIZE = (640, 480)
+
+
+class FakeVideoCapture:
+    """cv2.VideoCapture replacement that cycles through the images in a directory."""
+
+    images_dir = IMAGES_DIR
+    fps = 0  # 0 = frames are available immediately
+
+    def __init__(self, index=0, *args):
+        paths = sorted(p for p in glob.glob(os.path.join(self.images_dir, "*"))
+                       if p.lower().endswith((".jpg", ".jpeg", ".png")))
+        self.frames = [cv2.resize(cv2.imread(p), FRAME_SIZE) for p in paths]
+        if not self.frames:
+            raise FileNotFoundError(f"no images found in {self.images_dir}")
+        self.position = 0
+        self.opened = True
+        self.last_read = 0
+
+    def isOpened(self):
+        return self.opened
+
+    def set(self, prop, value):
+        return True
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return FRAME_SIZE[0]
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return FRAME_SIZE[1]
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        return 0
+
+    def read(self):
+        if not self.opened:
+            return False, None
+        if self.fps:
+            wait = self.last_read + 1 / self.fps - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            self.last_read = time.perf_counter()
+        frame = self.frames[self.position % len(self.frames)]
+        self.position += 1
+        return True, frame.copy()
+
+    def release(self):
+        self.opened = False
+
+
+class WavInputStream:
+    """
+    sounddevice.RawInputStream replacement that feeds a 16-bit mono WAV file to
+    the callback in `blocksize` chunks, paced at `speed` x real time (0 = as
+    fast as possible).
+    """
+
+    wav_path = None
+    speed = 1.0
+    loop = False
+
+    def __init__(self, samplerate=16000, blocksize=8000, dtype='int16', channels=1, callback=None, **kwargs):
+        self.samplerate = samplerate
+        self.blocksize = blocksize
+        self.callback = callback
+        self.audio = load_wav(self.wav_path, samplerate) if self.wav_path else np.zeros(samplerate, dtype=np.int16)
+        self.active = False
+        self.finished = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.active = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        block_s = self.blocksize / self.samplerate
+        next_time = time.perf_counter()
+        while self.active:
+            for offset in range(0, len(self.audio), self.blocksize):
+                if not self.active:
+                    break
+                block = self.audio[offset:offset + self.blocksize]
+                if len(block) < self.blocksize:
+                    block = np.pad(block, (0, self.blocksize - len(block)))
+                if self.speed:
+                    next_time += block_s / self.speed
+                    wait = next_time - time.perf_counter()
+                    if wait > 0:
+                        time.sleep(wait)
+                self.callback(block.tobytes(), self.blocksize, None, None)
+            if not self.loop:
+                break
+        self.finished.set()
+
+    def stop(self):
+        self.active = False
+
+    def close(self):
+        self.active = False
+
+
+def load_wav(path, samplerate=16000):
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"{path}: expected 16-bit samples")
+        audio = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+        if f.getnchannels() > 1:
+            audio = audio.reshape(-1, f.getnchannels()).mean(axis=1).astype(np.int16)
+        return resample(audio, f.getframerate(), samplerate)
+
+
+def save_wav(path, audio, samplerate=16000):
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(samplerate)
+        f.writeframes(np.asarray(audio, dtype=np.int16).tobytes())
+
+
+def resample(audio, source_rate, target_rate):
+    if source_rate == target_rate:
+        return audio
+    duration = len(audio) / source_rate
+    target = np.linspace(0, duration, int(duration * target_rate), endpoint=False)
+    source = np.arange(len(audio)) / source_rate
+    return np.interp(target, source, audio).astype(np.int16)
+
+
+class PtySerial:
+    """
+    A pseudo-terminal pair standing in for /dev/serial0. The robot side opens
+    `port` with pyserial; everything it writes is collected from the master
+    end together with the time it arrived.
+    """
+
+    def __init__(self):
+        self.master, slave = pty.openpty()
+        tty.setraw(self.master)
+        tty.setraw(slave)
+        self.port = os.ttyname(slave)
+        self.slave = slave  # keep open so the master never sees EOF
+        self.received = []  # (perf_counter timestamp, bytes)
+        self.lock = threading.Lock()
+        self.data_event = threading.Event()
+        threading.Thread(target=self._drain, daemon=True).start()
+
+    def _drain(self):
+        while True:
+            try:
+                data = os.read(self.master, 4096)
+            except OSError:
+                return
+            if not data:
+                return
+            with self.lock:
+                self.received.append((time.perf_counter(), data))
+            self.data_event.set()
+
+    def wait_for(self, count, timeout=1.0):
+        """Blocks until `count` bytes have arrived in total; returns the arrival time of the last one."""
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            with self.lock:
+                if sum(len(d) for _, d in self.received) >= count:
+                    return self.received[-1][0]
+            self.data_event.wait(0.01)
+            self.data_event.clear()
+        return None
+
+    def reset(self):
+        with self.lock:
+            self.received.clear()
+
+
+def install(wav=None, images_dir=IMAGES_DIR, audio_speed=1.0, camera_fps=0, headless=True):
+    """Patches the hardware entry points; returns the PtySerial standing in for the ESP32 link."""
+    import sounddevice as sd
+    import serial
+
+    FakeVideoCapture.images_dir = images_dir
+    FakeVideoCapture.fps = camera_fps
+    cv2.VideoCapture = FakeVideoCapture
+
+    WavInputStream.wav_path = wav
+    WavInputStream.speed = audio_speed
+    sd.RawInputStream = WavInputStream
+    sd.play = lambda *args, **kwargs: None
+    sd.wait = lambda *args, **kwargs: None
+
+    link = PtySerial()
+    real_serial = serial.Serial
+
+    def fake_serial(*args, **kwargs):
+        kwargs.pop("port", None)
+        return real_serial(link.port, *args[1:], **kwargs)
+
+    serial.Serial = fake_serial
+
+    if headless:
+        cv2.imshow = lambda *args, **kwargs: None
+        cv2.waitKey = lambda *args, **kwargs: -1
+        cv2.destroyAllWindows = lambda *args, **kwargs: None
+
+    return link
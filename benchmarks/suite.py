@@ -0,0 +1,274 @@
+"""
+End-to-end latency benchmark for the robot pipeline on a dev box.
+
+Camera, microphone and serial port are replaced by the fakes in
+benchmarks/fakes.py (test images, a WAV file, a pty). Each stage reports
+p50/p95/p99 latency and throughput; results are written as JSON and compared
+against a stored baseline, and the exit status is 1 when a stage regressed or
+failed to run.
+
+Stages:
+    cv_update   cv_cam.update(): YOLO, cache update, render (capture runs on the camera thread)
+    nlp         nlp.resolve() on utterances from the training dataset
+    speech      Vosk AcceptWaveform per 0.5 s audio block
+    tts         voice_output.synthesize()
+    serial      write of one wheel command until it arrives at the far end of the pty
+    end_to_end  last audio block of an utterance -> recognized text -> nlp -> synthesized reply
+
+Run from the project root:
+    python -m benchmarks.suite                      # run and compare with the baseline
+    python -m benchmarks.suite --save-baseline      # run and store the result as the new baseline
+    python -m benchmarks.suite --stages nlp,speech --wav session.wav
+"""
+
+import argparse
+import csv
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+from benchmarks import fakes
+
+
+RESULTS_PATH = "./benchmarks/results/latest.json"
+BASELINE_PATH = "./benchmarks/baseline.json"
+DATASET_PATH = "./datasets/train/motif_dataset_large.csv"
+STAGES = ["cv_update", "nlp", "speech", "tts", "serial", "end_to_end"]
+
+SAMPLE_RATE = 16000
+BLOCK_SIZE = 8000  # same as speech_recognition's input stream
+
+E2E_UTTERANCES = [
+    "Who made you?",
+    "Where is United Hospital Limited?",
+    "Hey there!",
+    "Where is the nearest police station?",
+]
+
+
+def summarize(latencies, wall_s):
+    ms = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "count": len(ms),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "throughput_per_s": len(ms) / wall_s if wall_s else 0.0,
+    }
+
+
+def timed(fn, items):
+    latencies = []
+    wall_start = time.perf_counter()
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - start)
+    return latencies, time.perf_counter() - wall_start
+
+
+def dataset_utterances(count):
+    with open(DATASET_PATH, newline='', encoding='utf-8') as f:
+        texts = [row["text"] for row in csv.DictReader(f)]
+    step = max(len(texts) // count, 1)
+    return texts[::step][:count]
+
+
+def synthesize_16k(text):
+    import voice_output
+    audio, rate = voice_output.synthesize(text)
+    return fakes.resample(audio, rate, SAMPLE_RATE)
+
+
+def blocks(audio):
+    for offset in range(0, len(audio), BLOCK_SIZE):
+        block = audio[offset:offset + BLOCK_SIZE]
+        yield np.pad(block, (0, BLOCK_SIZE - len(block))).tobytes()
+
+
+def utterance_audio(args):
+    if args.wav:
+        return fakes.load_wav(args.wav, SAMPLE_RATE)
+    # no recording given: let Piper read the sample utterances, with a second of silence between them
+    silence = np.zeros(SAMPLE_RATE, dtype=np.int16)
+    parts = []
+    for text in E2E_UTTERANCES:
+        parts += [synthesize_16k(text), silence]
+    return np.concatenate(parts)
+
+
+def bench_cv_update(args):
+    import cv_cam
+
+    # only calls that found a new frame count; the fake camera thread delivers at 30 FPS
+    latencies = []
+    wall_start = time.perf_counter()
+    while len(latencies) <= args.iterations:
+        start = time.perf_counter()
+        if cv_cam.update():
+            latencies.append(time.perf_counter() - start)
+        else:
+            time.sleep(0.001)
+    return latencies[1:], time.perf_counter() - wall_start  # the first call warms the model up
+
+
+def bench_nlp(args):
+    import nlp
+    texts = dataset_utterances(args.iterations)
+    nlp.resolve(texts[0])
+    return timed(nlp.resolve, texts)
+
+
+def bench_speech(args):
+    import speech_recognition as sr
+    audio_blocks = list(blocks(utterance_audio(args)))
+    return timed(sr.rec.AcceptWaveform, audio_blocks)
+
+
+def bench_tts(args):
+    import voice_output
+    voice_output.load()
+    texts = E2E_UTTERANCES * max(args.iterations // (4 * len(E2E_UTTERANCES)), 1)
+    return timed(voice_output.synthesize, texts)
+
+
+def bench_serial(args, link):
+    import communicator
+    command = b"[50,50]\n"
+
+    def send(_):
+        link.reset()
+        communicator.ser.write(command)
+        link.wait_for(len(command))
+
+    return timed(send, range(args.iterations))
+
+
+def bench_end_to_end(args):
+    import speech_recognition as sr
+    import voice_output
+    import nlp
+    from vosk import KaldiRecognizer
+
+    utterances = [synthesize_16k(text) for text in E2E_UTTERANCES]
+    latencies = []
+    wall_start = time.perf_counter()
+    for audio in utterances:
+        rec = KaldiRecognizer(sr.model, SAMPLE_RATE)
+        audio_blocks = list(blocks(audio))
+        for block in audio_blocks[:-1]:
+            rec.AcceptWaveform(block)
+
+        # everything before the last block overlaps with the user still talking
+        start = time.perf_counter()
+        rec.AcceptWaveform(audio_blocks[-1])
+        text = json.loads(rec.FinalResult()).get("text", "")
+        if text:
+            _, response = nlp.resolve(text)
+            if response:
+                voice_output.synthesize(response)
+        latencies.append(time.perf_counter() - start)
+    return latencies, time.perf_counter() - wall_start
+
+
+def compare(results, baseline, tolerance, stages):
+    regressions = []
+    for stage in stages:
+        # a stage that crashed has no numbers; that is a regression, not a pass
+        if stage in baseline.get("stages", {}) and stage not in results["stages"]:
+            regressions.append(f"{stage}: no result ({results['errors'].get(stage, 'not run')})")
+    for stage, current in results["stages"].items():
+        base = baseline.get("stages", {}).get(stage)
+        if base is None:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            if current[metric] > base[metric] * (1 + tolerance):
+                regressions.append(f"{stage}.{metric}: {base[metric]:.2f} -> {current[metric]:.2f} ms")
+        if current["throughput_per_s"] < base["throughput_per_s"] * (1 - tolerance):
+            regressions.append(f"{stage}.throughput_per_s: {base['throughput_per_s']:.2f} -> "
+                               f"{current['throughput_per_s']:.2f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", default=",".join(STAGES))
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--wav", help="16-bit WAV with speech for the speech stage (default: synthesized)")
+    parser.add_argument("--images", default=fakes.IMAGES_DIR)
+    parser.add_argument("--output", default=RESULTS_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    link = fakes.install(wav=args.wav, images_dir=args.images, audio_speed=0, camera_fps=30)
+
+    benches = {
+        "cv_update": bench_cv_update,
+        "nlp": bench_nlp,
+        "speech": bench_speech,
+        "tts": bench_tts,
+        "serial": lambda a: bench_serial(a, link),
+        "end_to_end": bench_end_to_end,
+    }
+
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": platform.machine(),
+        "python": platform.python_version(),
+        "stages": {},
+        "errors": {},
+    }
+    stages = args.stages.split(",")
+    for stage in stages:
+        print(f"INFO: running {stage}...")
+        try:
+            latencies, wall_s = benches[stage](args)
+        except Exception as e:
+            print(f"ERROR: stage {stage} failed: {e!r}")
+            results["errors"][stage] = repr(e)
+            continue
+        results["stages"][stage] = summary = summarize(latencies, wall_s)
+        print(f"  p50={summary['p50_ms']:.2f} ms  p95={summary['p95_ms']:.2f} ms  "
+              f"p99={summary['p99_ms']:.2f} ms  {summary['throughput_per_s']:.2f}/s")
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"INFO: results written to {args.output}")
+
+    failed = ", ".join(results["errors"])
+    if args.save_baseline:
+        if failed:
+            print(f"ERROR: baseline not saved, stage(s) failed: {failed}")
+            return 1
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"INFO: baseline saved to {args.baseline}")
+        return 0
+
+    regressions = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance, stages)
+        for r in regressions:
+            print(f"REGRESSION: {r}")
+        if not regressions:
+            print("INFO: no regressions against the baseline")
+    else:
+        print("INFO: no baseline yet, run with --save-baseline to create one")
+
+    if failed:
+        print(f"ERROR: stage(s) failed: {failed}")
+    return 1 if regressions or failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
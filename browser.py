@@ -1,5 +1,151 @@
-import webview
+"""
+Browser window for showing maps and search results.
+
+The window lives in its own long-running process (python browser.py), started
+once; open() and prefetch() only queue a command for it over a local socket
+and return immediately, so the speech thread is never blocked by the GUI.
+"""
+
+import queue
+import sys
+import threading
+import time
+
+import local_service
+import metrics
+
+ADDRESS = "/tmp/ndc_browser.sock"
+AUTHKEY = b"ndc-browser"
+START_TIMEOUT = 15
+
+_commands = queue.Queue()
+_sender = None
+_process = None
+_lock = threading.Lock()
+
+
+def start():
+    """Launches the browser service if it isn't running yet; safe to call more than once."""
+    global _process, _sender
+    with _lock:
+        if _process is None or _process.poll() is not None:
+            _process = local_service.launch(ADDRESS, AUTHKEY, __file__, [ADDRESS]) or _process
+        if _sender is None:
+            _sender = threading.Thread(target=_send_loop, daemon=True)
+            _sender.start()
+
 
 def open(link, name=""):
-    webview.create_window(name, link, fullscreen=False)
-    webview.start()
+    metrics.inc("browser_opens")
+    start()
+    _commands.put(("open", link, name, time.monotonic()))
+
+
+def prefetch(link):
+    """Loads a page into the hidden window so a later open() of the same link shows it at once."""
+    start()
+    _commands.put(("prefetch", link))
+
+
+def hide():
+    _commands.put(("hide",))
+
+
+def stats():
+    """Open-to-visible latencies (seconds) measured by the service, oldest first."""
+    connection = _connection()
+    try:
+        return connection.call(("stats",))
+    finally:
+        connection.close()
+
+
+def wait_ready(timeout=START_TIMEOUT):
+    """Blocks until the service accepts connections."""
+    local_service.connect(ADDRESS, AUTHKEY, timeout).close()
+
+
+def end():
+    _commands.put(("quit",))
+
+
+def _connection():
+    return local_service.Connection("browser", ADDRESS, AUTHKEY, start, START_TIMEOUT)
+
+
+def _send_loop():
+    connection = _connection()
+    while True:
+        command = _commands.get()
+        try:
+            connection.call(command, reply=False)
+        except (OSError, EOFError) as e:
+            print(f"WARNING: browser service unreachable, dropped {command[0]}: {e}")
+
+
+def serve(address=ADDRESS):
+    import webview
+
+    window = webview.create_window("", "about:blank", fullscreen=False, hidden=True)
+    state = {"url": None, "loaded": False, "visible": False, "pending": None}
+    latencies = []
+
+    def on_loaded():
+        state["loaded"] = True
+        if state["pending"] is not None:
+            latencies.append(time.monotonic() - state["pending"])
+            state["pending"] = None
+
+    window.events.loaded += on_loaded
+
+    def load(url):
+        state["url"] = url
+        state["loaded"] = False
+        window.load_url(url)
+
+    def handle(conn):
+        while True:
+            try:
+                command, *args = conn.recv()
+            except (EOFError, OSError):
+                return
+
+            if command == "open":
+                url, name, requested_at = args
+                if url != state["url"]:
+                    load(url)
+                if name:
+                    window.set_title(name)
+                if state["loaded"]:
+                    latencies.append(time.monotonic() - requested_at)
+                else:
+                    state["pending"] = requested_at
+                if not state["visible"]:
+                    window.show()
+                    state["visible"] = True
+            elif command == "prefetch":
+                # never navigate away from a page the user is looking at
+                if not state["visible"] and args[0] != state["url"]:
+                    load(args[0])
+            elif command == "hide":
+                window.hide()
+                state["visible"] = False
+            elif command == "stats":
+                conn.send(list(latencies))
+            elif command == "quit":
+                window.destroy()
+                return
+
+    def listen():
+        listener = local_service.listen(address, AUTHKEY)
+        print("INFO: browser service ready")
+        while True:
+            conn = listener.accept()
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+    # webview.start blocks on the GUI loop and runs listen() in its own thread
+    webview.start(listen)
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1] if len(sys.argv) > 1 else ADDRESS)
@@ -1,19 +1,203 @@
 import serial
+import threading
+import time
+
+import metrics
 
 
 
 ser = serial.Serial(
-    port='/dev/serial0',  
-    baudrate=115200,      
+    port='/dev/serial0',
+    baudrate=115200,
     timeout=1
 )
 
-def send_data_to_esp32(data):
-    object_data = ""
-    for label in object_target:
-        if len(object_target[label]) > 1:
-            object_data = object_target[label][0]
-            break
+# priority of the labels when several kinds of trash are in view
+TARGET_LABELS = ["plastic", "paper", "glass", "metal"]
+
+CONTROL_HZ = 50           # steering loop rate, independent of the detection rate
+BASE_SPEED = 40           # forward duty (%) while a target is tracked
+MAX_SPEED = 100
+TARGET_TIMEOUT = 3.0      # s without a new frame before the robot stops; above cv_cam.MOTION_REFRESH
+MAX_EXTRAPOLATION = 0.5   # s the target position is predicted ahead of the last detection
+VELOCITY_SMOOTHING = 0.5  # weight of the newest velocity estimate
+SETPOINT_SMOOTHING = 0.3  # weight of the newest setpoint (per control tick)
+KEEPALIVE = 1.0           # s; resend unchanged setpoints this often in case a line was lost
+
+# PID on the horizontal error, normalized to [-0.5, 0.5] of the frame width
+KP = 120
+KI = 10
+KD = 15
+
 
-    data = f"[{object_data['cx']/screen_width * 100},{object_data['cx']/screen_width * 100}]"
+def send_data_to_esp32(left, right):
+    # esp32_driver.py expects "[left,right]\n" with integer duty percentages
+    data = f"[{left},{right}]\n"
     ser.write(data.encode('utf-8'))
+
+
+def select_target(object_chache):
+    """The largest (closest) detection of the highest priority label, or None."""
+    for label in TARGET_LABELS:
+        objects = object_chache.get(label)
+        if objects:
+            return max(objects, key=lambda o: (o['xmax'] - o['xmin']) * (o['ymax'] - o['ymin']))
+    return None
+
+
+class TargetTracker:
+    """Constant-velocity model of the target's horizontal position between detections."""
+
+    def __init__(self):
+        self.cx = None
+        self.vx = 0.0
+        self.time = None
+
+    def update(self, cx, timestamp):
+        if self.cx is not None and 0 < timestamp - self.time < TARGET_TIMEOUT:
+            velocity = (cx - self.cx) / (timestamp - self.time)
+            self.vx = VELOCITY_SMOOTHING * velocity + (1 - VELOCITY_SMOOTHING) * self.vx
+        else:
+            self.vx = 0.0
+        self.cx = cx
+        self.time = timestamp
+
+    def predict(self, now):
+        return self.cx + self.vx * min(now - self.time, MAX_EXTRAPOLATION)
+
+    def reset(self):
+        self.cx = None
+        self.vx = 0.0
+        self.time = None
+
+
+class PID:
+    def __init__(self, kp, ki, kd, limit):
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.limit = limit
+        self.reset()
+
+    def step(self, error, dt):
+        self.integral += error * dt
+        # anti-windup: the integral term alone never exceeds the output limit
+        if self.ki:
+            self.integral = max(-self.limit / self.ki, min(self.limit / self.ki, self.integral))
+        derivative = (error - self.previous) / dt if self.previous is not None and dt > 0 else 0.0
+        self.previous = error
+        output = self.kp * error + self.ki * self.integral + self.kd * derivative
+        return max(-self.limit, min(self.limit, output))
+
+    def reset(self):
+        self.integral = 0.0
+        self.previous = None
+
+
+class SteeringController:
+    """
+    Drives toward the tracked target at CONTROL_HZ. `camera` is a cv_cam.Camera
+    (anything with .chache, .chache_time and .width); its detections arrive at
+    the detection rate, in between the target is extrapolated.
+    """
+
+    def __init__(self, camera, rate=CONTROL_HZ, send=send_data_to_esp32):
+        self.camera = camera
+        self.period = 1 / rate
+        self.send = send
+        self.tracker = TargetTracker()
+        self.pid = PID(KP, KI, KD, MAX_SPEED)
+        self.seen_time = None
+        self.setpoint = (0.0, 0.0)
+        self.sent = None
+        self.sent_time = 0
+        self.ticks = 0
+        self.commands = 0
+        self.running = False
+        self.thread = None
+
+    def step(self, now, dt):
+        chache_time = self.camera.chache_time
+        if chache_time != self.seen_time:
+            self.seen_time = chache_time
+            target = select_target(self.camera.chache)
+            if target is not None:
+                self.tracker.update(target['cx'], chache_time)
+            else:
+                # a fresh frame without the target: it is gone, don't keep steering
+                # toward where it was; TARGET_TIMEOUT is for when no frames arrive
+                self.tracker.reset()
+
+        if self.tracker.cx is None or now - self.tracker.time > TARGET_TIMEOUT:
+            self.tracker.reset()
+            self.pid.reset()
+            goal = (0.0, 0.0)
+        else:
+            cx = max(0.0, min(self.camera.width, self.tracker.predict(now)))
+            error = cx / self.camera.width - 0.5
+            turn = self.pid.step(error, dt)
+            # target to the right -> left wheels faster
+            goal = (BASE_SPEED + turn, BASE_SPEED - turn)
+
+        left = self.setpoint[0] + SETPOINT_SMOOTHING * (goal[0] - self.setpoint[0])
+        right = self.setpoint[1] + SETPOINT_SMOOTHING * (goal[1] - self.setpoint[1])
+        self.setpoint = (left, right)
+        return (int(round(max(-MAX_SPEED, min(MAX_SPEED, left)))),
+                int(round(max(-MAX_SPEED, min(MAX_SPEED, right)))))
+
+    def tick(self, now, dt):
+        with metrics.span("steering_step"):
+            command = self.step(now, dt)
+        self.ticks += 1
+
+        if command != self.sent or now - self.sent_time > KEEPALIVE:
+            self.send(*command)
+            self.sent = command
+            self.sent_time = now
+            self.commands += 1
+            metrics.inc("steering_commands")
+
+    def halt(self):
+        """Best-effort stop after a failed tick; the next tick starts over from rest."""
+        self.tracker.reset()
+        self.pid.reset()
+        self.setpoint = (0.0, 0.0)
+        self.sent = None  # resend whatever the next tick computes
+        try:
+            self.send(0, 0)
+            self.sent = (0, 0)
+        except Exception as e:
+            print(f"WARNING: couldn't stop the motors: {e!r}")
+
+    def run(self):
+        previous = time.monotonic()
+        next_tick = previous
+        while self.running:
+            now = time.monotonic()
+            try:
+                self.tick(now, now - previous)
+            except Exception as e:
+                # esp32_driver.py keeps the last duty it got, so never just let the thread die
+                print(f"WARNING: steering tick failed: {e!r}")
+                metrics.inc("steering_errors")
+                self.halt()
+            previous = now
+
+            next_tick += self.period
+            wait = next_tick - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            else:
+                next_tick = time.monotonic()  # fell behind; don't try to catch up with a burst
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        print(f"INFO: steering controller running at {1 / self.period:.0f} Hz")
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1)
+        self.send(0, 0)
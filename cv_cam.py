@@ -1,8 +1,11 @@
-import torch
 import cv2
+import threading
 import time
 import time
 
+import detectors
+import metrics
+
 object_target = ["plastic", "paper", "glass", "metal"]
 
 object_id = {
@@ -12,31 +15,144 @@ object_id = {
     "metal" : 4
 }
 
-object_chache = {
-    "plastic" : [],
-    "paper" : [],
-    "glass" : [],
-    "metal": [],    
+# camera name -> cv2.VideoCapture source (device index, file or stream url);
+# the first one is the primary camera used for steering
+CAMERAS = {
+    "front" : 0,
+    # "bin" : 2,
 }
 
-model = torch.hub.load(
-    'yolov5', 
-    'custom', 
-    path='weights/trash.pt',  
-    source='local'
-)
-model.conf = 0.4  
-
-cap = cv2.VideoCapture(0)
-cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-
-screen_width  = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-screen_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+# torch hub model by default; `python detectors.py export/tune` switches to a
+# faster ONNX (optionally int8) runtime through weights/detector.json
+model = detectors.load(conf=0.4)
+
+# frames that barely differ from the last detected one reuse its detections;
+# a frame counts as changed when more than MOTION_THRESHOLD of the pixels of a
+# 64x48 grayscale thumbnail moved by more than MOTION_PIXEL_DELTA levels
+MOTION_GATING = True
+MOTION_THRESHOLD = 0.002
+MOTION_PIXEL_DELTA = 15
+MOTION_REFRESH = 2.0  # seconds; detections are refreshed at least this often
+MOTION_SIZE = (64, 48)
+
+
+class MotionGate:
+    def __init__(self, threshold=MOTION_THRESHOLD, pixel_delta=MOTION_PIXEL_DELTA, refresh=MOTION_REFRESH):
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.refresh = refresh
+        self.reference = None
+        self.reference_time = 0
+        self.checked = 0
+        self.skipped = 0
+
+    def should_detect(self, frame, now):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        small = cv2.GaussianBlur(cv2.resize(gray, MOTION_SIZE, interpolation=cv2.INTER_AREA), (5, 5), 0)
+        self.checked += 1
+
+        # compare with the frame the current detections came from, not the
+        # previous frame, so slow drift still adds up to a refresh
+        if self.reference is not None and now - self.reference_time < self.refresh:
+            changed = cv2.countNonZero(cv2.threshold(cv2.absdiff(small, self.reference), self.pixel_delta, 255,
+                                                     cv2.THRESH_BINARY)[1])
+            if changed < self.threshold * small.size:
+                self.skipped += 1
+                return False
+
+        self.reference = small
+        self.reference_time = now
+        return True
+
+    def skip_ratio(self):
+        return self.skipped / self.checked if self.checked else 0.0
+
+
+
+def new_object_chache():
+    return {label: [] for label in object_target}
+
+
+class Camera:
+    """Grabs frames on its own thread and keeps only the latest one, plus that camera's detections."""
+
+    def __init__(self, name, source):
+        self.name = name
+        self.cap = cv2.VideoCapture(source)
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+        self.chache = new_object_chache()
+        self.chache_time = 0
+        self.gate = MotionGate()
+
+        self.lock = threading.Lock()
+        # a replayed recording hands every frame to the detector, in order, so
+        # a replay detects the same frames however fast the machine is
+        self.paced = getattr(self.cap, "paced", False)
+        self.taken = threading.Condition(self.lock)
+        self.frame = None
+        self.frame_id = 0
+        self.processed_id = 0
+        self.captured = 0
+        self.processed = 0
+        self.started = time.monotonic()
+        self.running = True
+        self.thread = threading.Thread(target=self.capture_loop, daemon=True)
+        self.thread.start()
+
+    def capture_loop(self):
+        while self.running:
+            if self.paced:
+                with self.taken:
+                    while self.running and self.frame_id != self.processed_id:
+                        self.taken.wait(0.1)
+            with metrics.span("cv_capture"):
+                ret, frame = self.cap.read()
+            if not ret:
+                metrics.inc("cv_capture_failures")
+                if getattr(self.cap, "finished", False):
+                    break  # replayed recording is over
+                print(f"COULDN'T CAPTURE FRAME' ({self.name})")
+                time.sleep(0.1)
+                continue
+            with self.lock:
+                self.frame = frame
+                self.frame_id += 1
+                self.captured += 1
+
+    def latest(self):
+        """The newest frame if it hasn't been through the detector yet, else None."""
+        with self.lock:
+            if self.frame is None or self.frame_id == self.processed_id:
+                return None
+            self.processed_id = self.frame_id
+            self.taken.notify()
+            return self.frame
+
+    def stop(self):
+        self.running = False
+        self.thread.join(timeout=1)
+        self.cap.release()
+
+
+cameras = {name: Camera(name, source) for name, source in CAMERAS.items()}
+primary = next(iter(cameras.values()))
+
+# single-camera names kept for the rest of the code
+cap = primary.cap
+object_chache = primary.chache
+screen_width  = primary.width
+screen_height = primary.height
 
 target_fps = 5
 delay = 1 / target_fps
 prev_time = 0
 
+# batch size -> [total forward seconds, number of forward passes]
+batch_times = {}
+
 
 def object_similarity(data1, data2):
     w1 = (data1['xmax'] - data1['xmin'])
@@ -51,10 +167,14 @@ def object_similarity(data1, data2):
 
 
 
-def update_object_chache(results):
-    df = results.pandas().xyxy[0]
+def update_object_chache(detections, chache=None):
+    chache = object_chache if chache is None else chache
 
-    for _, row in df.iterrows():
+    # the cache holds the detections of the latest frame only; fill new lists
+    # and swap them in, the steering thread reads the cache concurrently
+    fresh = {label: [] for label in chache}
+
+    for row in detections:
         label = row['name']
         xmin, ymin, xmax, ymax = row['xmin'], row['ymin'], row['xmax'], row['ymax']
 
@@ -70,31 +190,111 @@ def update_object_chache(results):
             'cy': float(cy)
         }
         
-        if label in objects_chache:
-            objects_dict[label].append(obj_info)
+        if label in fresh:
+            fresh[label].append(obj_info)
 
+    chache.update(fresh)
 
-def update():
-    ret, frame = cap.read()
 
-    if not ret:
-        print("COULDN'T CAPTURE FRAME'")
-        return
+def update():
+    """
+    Runs one batched detection over the newest frame of every camera whose
+    scene changed; returns how many new frames it handled (detected or skipped).
+    """
+    batch = []
+    handled = 0
+    now = time.monotonic()
+    for cam in cameras.values():
+        frame = cam.latest()
+        if frame is None:
+            continue
+        handled += 1
+        if MOTION_GATING:
+            with metrics.span("cv_motion"):
+                changed = cam.gate.should_detect(frame, now)
+            if not changed:
+                # nothing moved, so the cached detections are confirmed as of now
+                cam.chache_time = now
+                metrics.inc("cv_frames_skipped")
+                continue
+        batch.append((cam, frame))
+
+    if not batch:
+        return handled
+
+    start = time.perf_counter()
+    with metrics.span("cv_yolo"):
+        detections = model.detect([frame for _, frame in batch])
+    elapsed = time.perf_counter() - start
+    totals = batch_times.setdefault(len(batch), [0.0, 0])
+    totals[0] += elapsed
+    totals[1] += 1
+
+    with metrics.span("cv_ingest"):
+        for (cam, _), frame_detections in zip(batch, detections):
+            update_object_chache(frame_detections, cam.chache)
+            cam.chache_time = now
+            cam.processed += 1
+    with metrics.span("cv_render"):
+        for (cam, frame), frame_detections in zip(batch, detections):
+            labeled_frame = detectors.draw(frame, frame_detections)
+            title = 'YOLO Detection' if len(cameras) == 1 else f'YOLO Detection ({cam.name})'
+            cv2.imshow(title, labeled_frame)
+    metrics.inc("cv_frames", len(batch))
+    return handled
+
+
+def report():
+    """
+    Per-camera capture/detection FPS, motion-gate skip ratio and the YOLO time it
+    saved, and how much batching saves over one forward pass per frame.
+    """
+    stats = {"cameras": {}, "batches": {}}
+    for size, (total, count) in sorted(batch_times.items()):
+        stats["batches"][size] = {"passes": count, "ms_per_frame": total / count / size * 1000}
+
+    total_time = sum(total for total, _ in batch_times.values())
+    total_frames = sum(size * count for size, (_, count) in batch_times.items())
+    ms_per_frame = total_time / total_frames * 1000 if total_frames else 0.0
+
+    now = time.monotonic()
+    for cam in cameras.values():
+        elapsed = now - cam.started
+        stats["cameras"][cam.name] = {
+            "capture_fps": cam.captured / elapsed,
+            "detection_fps": cam.processed / elapsed,
+            "skip_ratio": cam.gate.skip_ratio(),
+            # estimate: skipped frames times the average detector cost per frame
+            "saved_s": cam.gate.skipped * ms_per_frame / 1000,
+        }
+        metrics.set_gauge(f"cv_detection_fps_{cam.name}", cam.processed / elapsed)
+        metrics.set_gauge(f"cv_skip_ratio_{cam.name}", cam.gate.skip_ratio())
 
-    results = model(frame)
-    update_object_chache(results)
-    labeled_frame = results.render()[0]
+    single = stats["batches"].get(1)
+    for size, batch in stats["batches"].items():
+        if single and size > 1:
+            # > 1 means one batched pass beats `size` separate passes
+            batch["efficiency"] = single["ms_per_frame"] / batch["ms_per_frame"]
 
-    cv2.imshow('YOLO Detection', labeled_frame)
+    for name, cam in stats["cameras"].items():
+        print(f"INFO: camera {name}: capture {cam['capture_fps']:.1f} FPS, detection {cam['detection_fps']:.1f} FPS, "
+              f"skipped {cam['skip_ratio']:.0%} of frames (~{cam['saved_s']:.1f} s of YOLO saved)")
+    for size, batch in stats["batches"].items():
+        efficiency = f", {batch['efficiency']:.2f}x vs single" if "efficiency" in batch else ""
+        print(f"INFO: batch of {size}: {batch['passes']} passes, {batch['ms_per_frame']:.1f} ms/frame{efficiency}")
+    return stats
 
 
 def end():
-    cap.release()
+    for cam in cameras.values():
+        cam.stop()
     cv2.destroyAllWindows()
 
 
-def get_object_chache():
-    return object_chache
+def get_object_chache(camera=None):
+    if camera is None:
+        return object_chache
+    return cameras[camera].chache
 
 
 
@@ -0,0 +1,344 @@
+"""
+Trash detector backends for cv_cam.
+
+Every backend takes a list of BGR frames and returns, per frame, a list of
+detections {'name', 'confidence', 'xmin', 'ymin', 'xmax', 'ymax'}:
+
+    hub   the original eager PyTorch model, torch.hub.load('yolov5', 'custom', ...)
+    onnx  the same weights exported to ONNX and run with onnxruntime,
+          optionally statically quantized to int8
+
+load() picks the backend from weights/detector.json (written by `tune`) and
+falls back to the hub model.
+
+Run from the project root:
+    python detectors.py export --int8   # weights/trash.onnx and weights/trash.int8.onnx
+    python detectors.py tune            # pick the fastest backend/thread count within the mAP drift limit,
+                                        # write weights/detector.json
+    python detectors.py parity          # boxes/classes vs the hub model: mAP drift and speedup
+"""
+
+import argparse
+import ast
+import glob
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+WEIGHTS = "weights/trash.pt"
+ONNX_PATH = "weights/trash.onnx"
+INT8_PATH = "weights/trash.int8.onnx"
+CONFIG_PATH = "weights/detector.json"
+PARITY_PATH = "weights/detector_parity.json"
+CALIBRATION_DIR = "datasets/test"
+
+IMG_SIZE = 640
+CONF = 0.4
+IOU = 0.45  # yolov5's NMS default
+MAX_MAP_DRIFT = 0.02  # tune() rejects backends whose mAP@0.5 vs the hub model drops by more
+
+
+class HubDetector:
+    def __init__(self, weights=WEIGHTS, conf=CONF, threads=None):
+        import torch
+        if threads:
+            torch.set_num_threads(threads)
+        self.model = torch.hub.load('yolov5', 'custom', path=weights, source='local')
+        self.model.conf = conf
+        self.names = self.model.names
+
+    def detect(self, frames):
+        results = self.model(frames)
+        return [df.to_dict('records') for df in results.pandas().xyxy]
+
+
+class OnnxDetector:
+    def __init__(self, path=ONNX_PATH, conf=CONF, iou=IOU, threads=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.conf = conf
+        self.iou = iou
+
+        # yolov5's export stores the class names in the model metadata
+        names = ast.literal_eval(self.session.get_modelmeta().custom_metadata_map.get("names", "{}"))
+        self.names = dict(enumerate(names)) if isinstance(names, list) else names
+
+    def detect(self, frames):
+        batch, transforms = [], []
+        for frame in frames:
+            image, transform = letterbox(frame)
+            batch.append(image)
+            transforms.append(transform)
+        x = np.ascontiguousarray(np.stack(batch).transpose(0, 3, 1, 2), dtype=np.float32) / 255
+        predictions = self.session.run(None, {self.input_name: x})[0]
+        return [self.postprocess(p, t, f.shape) for p, t, f in zip(predictions, transforms, frames)]
+
+    def postprocess(self, prediction, transform, shape):
+        # rows are [cx, cy, w, h, objectness, class scores...] in letterboxed pixels
+        scores = prediction[:, 5:] * prediction[:, 4:5]
+        classes = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(scores)), classes]
+        keep = confidences >= self.conf
+        boxes, classes, confidences = prediction[keep, :4], classes[keep], confidences[keep]
+        if not len(boxes):
+            return []
+
+        # offset boxes per class so one NMS call never suppresses across classes
+        offset = classes[:, None] * 4096
+        xywh = np.concatenate([boxes[:, :2] - boxes[:, 2:] / 2 + offset, boxes[:, 2:]], axis=1)
+        kept = cv2.dnn.NMSBoxes(xywh.tolist(), confidences.tolist(), self.conf, self.iou)
+
+        ratio, pad_x, pad_y = transform
+        height, width = shape[:2]
+        detections = []
+        for i in np.array(kept).flatten():
+            cx, cy, w, h = boxes[i]
+            detections.append({
+                'xmin': float(np.clip((cx - w / 2 - pad_x) / ratio, 0, width)),
+                'ymin': float(np.clip((cy - h / 2 - pad_y) / ratio, 0, height)),
+                'xmax': float(np.clip((cx + w / 2 - pad_x) / ratio, 0, width)),
+                'ymax': float(np.clip((cy + h / 2 - pad_y) / ratio, 0, height)),
+                'confidence': float(confidences[i]),
+                'class': int(classes[i]),
+                'name': self.names.get(int(classes[i]), str(classes[i])),
+            })
+        return detections
+
+
+def letterbox(frame, size=IMG_SIZE):
+    """Resize keeping the aspect ratio and pad to size x size with yolov5's gray (114)."""
+    height, width = frame.shape[:2]
+    ratio = min(size / height, size / width)
+    new_w, new_h = int(round(width * ratio)), int(round(height * ratio))
+    pad_x, pad_y = (size - new_w) / 2, (size - new_h) / 2
+    resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    image = cv2.copyMakeBorder(resized, int(round(pad_y - 0.1)), int(round(pad_y + 0.1)),
+                               int(round(pad_x - 0.1)), int(round(pad_x + 0.1)),
+                               cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    return image, (ratio, pad_x, pad_y)
+
+
+def draw(frame, detections):
+    labeled = frame.copy()
+    for det in detections:
+        p1 = (int(det['xmin']), int(det['ymin']))
+        p2 = (int(det['xmax']), int(det['ymax']))
+        cv2.rectangle(labeled, p1, p2, (0, 255, 0), 2)
+        cv2.putText(labeled, f"{det['name']} {det['confidence']:.2f}", (p1[0], max(p1[1] - 5, 10)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+    return labeled
+
+
+def create(backend="hub", path=None, threads=None, conf=CONF):
+    if backend == "hub":
+        return HubDetector(path or WEIGHTS, conf=conf, threads=threads)
+    if backend == "onnx":
+        return OnnxDetector(path or ONNX_PATH, conf=conf, threads=threads)
+    raise ValueError(f"Unknown detector backend '{backend}'")
+
+
+def load(config_path=CONFIG_PATH, conf=CONF):
+    config = {"backend": "hub"}
+    if os.path.exists(config_path):
+        with open(config_path, encoding="utf-8") as f:
+            config = json.load(f)
+    print(f"INFO: detector backend {config['backend']} {config.get('path', '')} threads={config.get('threads')}")
+    return create(config["backend"], config.get("path"), config.get("threads"), conf)
+
+
+def test_images(directory=CALIBRATION_DIR):
+    paths = sorted(p for p in glob.glob(os.path.join(directory, "*"))
+                   if p.lower().endswith((".jpg", ".jpeg", ".png")))
+    return [cv2.imread(p) for p in paths]
+
+
+def export(int8=False):
+    # yolov5's exporter knows how to trace its Detect head and embeds the class names
+    sys.path.insert(0, "yolov5")
+    import export as yolov5_export
+    yolov5_export.run(weights=WEIGHTS, include=("onnx",), imgsz=(IMG_SIZE, IMG_SIZE), dynamic=True)
+    print(f"INFO: exported {ONNX_PATH}")
+
+    if int8:
+        quantize(ONNX_PATH, INT8_PATH)
+
+
+def quantize(source, target):
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    class TestImageReader(CalibrationDataReader):
+        def __init__(self):
+            images = test_images()
+            # mirrored copies double the tiny calibration set
+            images += [cv2.flip(image, 1) for image in images]
+            self.samples = iter(
+                {"images": np.ascontiguousarray(letterbox(image)[0].transpose(2, 0, 1)[None], dtype=np.float32) / 255}
+                for image in images
+            )
+
+        def get_next(self):
+            return next(self.samples, None)
+
+    quantize_static(source, target, TestImageReader(), quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8, per_channel=True)
+    print(f"INFO: quantized {target} (calibrated on {CALIBRATION_DIR})")
+
+
+def latency(detector, images, repeats=5):
+    detector.detect(images[:1])  # warm up
+    samples = []
+    for _ in range(repeats):
+        for image in images:
+            start = time.perf_counter()
+            detector.detect([image])
+            samples.append(time.perf_counter() - start)
+    return float(np.median(samples))
+
+
+def candidates():
+    found = [("hub", WEIGHTS)]
+    found += [("onnx", path) for path in (ONNX_PATH, INT8_PATH) if os.path.exists(path)]
+    return found
+
+
+def tune(max_drift=MAX_MAP_DRIFT):
+    images = test_images()
+    thread_counts = sorted({1, 2, max(os.cpu_count() // 2, 1), os.cpu_count()})
+    ref_detections = HubDetector().detect(images)
+    best = None
+    for backend, path in candidates():
+        if backend != "hub":
+            # the detections don't depend on the thread count, so check parity once per model
+            mAP = mean_average_precision(detect_each(create(backend, path), images), ref_detections)
+            if 1 - mAP > max_drift:
+                print(f"{backend:<5} {os.path.basename(path):<18} rejected: mAP@0.5 vs hub {mAP:.3f} "
+                      f"(drift {1 - mAP:.3f} > {max_drift})")
+                continue
+        for threads in thread_counts:
+            seconds = latency(create(backend, path, threads), images)
+            print(f"{backend:<5} {os.path.basename(path):<18} threads={threads:<3} {seconds * 1000:8.1f} ms/frame")
+            if best is None or seconds < best[0]:
+                best = (seconds, {"backend": backend, "path": path, "threads": threads})
+
+    with open(CONFIG_PATH, "w", encoding="utf-8") as f:
+        json.dump(best[1], f, indent=2)
+    print(f"INFO: selected {best[1]} ({best[0] * 1000:.1f} ms/frame), written to {CONFIG_PATH}")
+
+
+def detect_each(detector, images):
+    # one image per call, the way cv_cam runs with a single camera
+    return [detector.detect([image])[0] for image in images]
+
+
+def iou(a, b):
+    ix = max(0.0, min(a['xmax'], b['xmax']) - max(a['xmin'], b['xmin']))
+    iy = max(0.0, min(a['ymax'], b['ymax']) - max(a['ymin'], b['ymin']))
+    inter = ix * iy
+    area = lambda d: (d['xmax'] - d['xmin']) * (d['ymax'] - d['ymin'])
+    union = area(a) + area(b) - inter
+    return inter / union if union else 0.0
+
+
+def mean_average_precision(predictions, references, threshold=0.5):
+    """mAP@threshold of `predictions` taking `references` as ground truth (lists per image)."""
+    # a class only the predictions have is all false positives, and must count against them
+    classes = {d['name'] for dets in list(references) + list(predictions) for d in dets}
+    aps = []
+    for name in classes:
+        truth = [[d for d in dets if d['name'] == name] for dets in references]
+        total = sum(len(t) for t in truth)
+        preds = sorted(((d['confidence'], i, d) for i, dets in enumerate(predictions) for d in dets if d['name'] == name),
+                       key=lambda p: -p[0])
+        if total == 0:
+            aps.append(0.0)
+            continue
+        used = [set() for _ in truth]
+        tp = []
+        for _, i, pred in preds:
+            best, best_j = 0.0, None
+            for j, gt in enumerate(truth[i]):
+                overlap = iou(pred, gt)
+                if j not in used[i] and overlap > best:
+                    best, best_j = overlap, j
+            if best >= threshold:
+                used[i].add(best_j)
+                tp.append(1)
+            else:
+                tp.append(0)
+
+        tp = np.array(tp, dtype=float)
+        cum_tp = np.cumsum(tp)
+        recall = cum_tp / total if len(tp) else np.array([])
+        precision = cum_tp / np.arange(1, len(tp) + 1) if len(tp) else np.array([])
+        # all-point interpolated AP
+        r = np.concatenate([[0.0], recall, [1.0]])
+        p = np.concatenate([[1.0], precision, [0.0]])
+        p = np.maximum.accumulate(p[::-1])[::-1]
+        aps.append(float(np.sum((r[1:] - r[:-1]) * p[1:])))
+    return float(np.mean(aps)) if aps else 1.0
+
+
+def parity():
+    images = test_images()
+    threads = None
+    if os.path.exists(CONFIG_PATH):
+        with open(CONFIG_PATH, encoding="utf-8") as f:
+            threads = json.load(f).get("threads")
+
+    reference = HubDetector(threads=threads)
+    ref_detections = reference.detect(images)
+    ref_latency = latency(reference, images)
+
+    report = {"reference": {"backend": "hub", "ms_per_frame": ref_latency * 1000}, "candidates": []}
+    print(f"hub   {os.path.basename(WEIGHTS):<18} {ref_latency * 1000:8.1f} ms/frame (reference)")
+    for backend, path in candidates()[1:]:
+        detector = create(backend, path, threads)
+        detections = detect_each(detector, images)
+        mAP = mean_average_precision(detections, ref_detections)
+        seconds = latency(detector, images)
+        result = {
+            "backend": backend,
+            "path": path,
+            "map50_vs_reference": mAP,
+            "map_drift": 1 - mAP,
+            "within_drift_limit": 1 - mAP <= MAX_MAP_DRIFT,
+            "detections": sum(len(d) for d in detections),
+            "reference_detections": sum(len(d) for d in ref_detections),
+            "ms_per_frame": seconds * 1000,
+            "speedup": ref_latency / seconds,
+        }
+        report["candidates"].append(result)
+        print(f"{backend:<5} {os.path.basename(path):<18} {seconds * 1000:8.1f} ms/frame  "
+              f"speedup {result['speedup']:.2f}x  mAP@0.5 vs hub {mAP:.3f} (drift {1 - mAP:.3f})  "
+              f"boxes {result['detections']}/{result['reference_detections']}")
+
+    with open(PARITY_PATH, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"INFO: parity report written to {PARITY_PATH}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["export", "tune", "parity"])
+    parser.add_argument("--int8", action="store_true", help="also write a statically quantized int8 model")
+    parser.add_argument("--max-drift", type=float, default=MAX_MAP_DRIFT,
+                        help="tune: largest accepted mAP@0.5 drop vs the hub model")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export(args.int8)
+    elif args.command == "tune":
+        tune(args.max_drift)
+    else:
+        parity()
@@ -0,0 +1,109 @@
+import faiss
+import numpy as np
+import math
+
+# flat  : exact L2 scan, fine for the small CSVs shipped in utils/
+# ivf   : inverted lists over k-means cells, only `nprobe` cells are scanned per query
+# hnsw  : graph search, no training needed, best latency for large knowledge bases
+# ip    : exact inner product on normalized vectors (cosine similarity)
+INDEX_TYPES = ("flat", "ivf", "hnsw", "ip")
+
+# below this many rows an approximate index is slower to build than a flat scan
+# is to query, so we quietly fall back to "flat"
+MIN_APPROX_ROWS = 1000
+
+
+def prepare(vectors, index_type):
+    vectors = np.ascontiguousarray(vectors, dtype='float32')
+    if index_type == "ip":
+        vectors = vectors.copy()
+        faiss.normalize_L2(vectors)
+    return vectors
+
+
+def build_index(embeddings, index_type="flat", ids=None, nlist=None, nprobe=8, hnsw_m=32, ef_search=64):
+    """
+    Builds an ID-mapped index: search() returns the given `ids` (default
+    0..n-1) instead of row positions, so rows can later be added and removed
+    without renumbering the rest.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}', expected one of {INDEX_TYPES}")
+
+    embeddings = prepare(embeddings, index_type)
+    n, dim = embeddings.shape
+    if ids is None:
+        ids = np.arange(n, dtype='int64')
+
+    if index_type in ("ivf", "hnsw") and n < MIN_APPROX_ROWS:
+        index_type = "flat"
+
+    if index_type == "flat":
+        base = faiss.IndexFlatL2(dim)
+    elif index_type == "ip":
+        base = faiss.IndexFlatIP(dim)
+    elif index_type == "ivf":
+        # faiss wants ~39 training points per cell
+        nlist = nlist or max(1, min(int(4 * math.sqrt(n)), n // 39))
+        quantizer = faiss.IndexFlatL2(dim)
+        base = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_L2)
+        base.train(embeddings)
+    else:
+        base = faiss.IndexHNSWFlat(dim, hnsw_m)
+
+    if index_type == "ivf":
+        # IVF stores external ids natively; the hashtable direct map allows
+        # reconstruct() and remove_ids() on arbitrary ids
+        base.set_direct_map_type(faiss.DirectMap.Hashtable)
+        index = base
+    else:
+        index = faiss.IndexIDMap2(base)
+    index.add_with_ids(embeddings, np.asarray(ids, dtype='int64'))
+    set_search_params(index, nprobe=nprobe, ef_search=ef_search)
+    return index
+
+
+def base_index(index):
+    if isinstance(index, faiss.IndexIDMap):
+        return faiss.downcast_index(index.index)
+    return index
+
+
+def set_search_params(index, nprobe=None, ef_search=None):
+    index = base_index(index)
+    if nprobe is not None and isinstance(index, faiss.IndexIVF):
+        index.nprobe = nprobe
+    if ef_search is not None and isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = ef_search
+
+
+def add(index, vectors, ids, index_type):
+    index.add_with_ids(prepare(vectors, index_type), np.asarray(ids, dtype='int64'))
+
+
+def remove(index, ids):
+    """Removes `ids` in place; returns False when the index type can't delete (HNSW)."""
+    try:
+        index.remove_ids(np.asarray(ids, dtype='int64'))
+        return True
+    except RuntimeError:
+        return False
+
+
+def vectors(index, ids):
+    # vectors are stored already prepared, so no second normalization on rebuild
+    return np.vstack([index.reconstruct(int(i)) for i in ids]) if len(ids) else None
+
+
+def copy(index):
+    return faiss.clone_index(index)
+
+
+def search(index, queries, index_type, k=1):
+    """Returns (distances, ids); distances are squared L2 for every index type."""
+    queries = prepare(queries, index_type)
+    D, I = index.search(queries, k)
+    if index_type == "ip":
+        # for unit vectors |a - b|^2 = 2 - 2 a.b, so one threshold works for all types
+        D = 2.0 - 2.0 * D
+    return D, I
@@ -0,0 +1,86 @@
+from collections import defaultdict
+import re
+
+from fuzzywuzzy import fuzz
+
+
+def normalize(text):
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+
+def char_ngrams(text, n=3):
+    padded = f" {text} "
+    return {padded[i:i + n] for i in range(max(len(padded) - n + 1, 1))}
+
+
+class LexicalIndex:
+    """
+    Exact and near-exact matching of an utterance against every responder key.
+
+    A lookup returns {intent: key} for the matched key (several intents when the
+    same key appears in more than one knowledge base), or None when nothing is
+    close enough and the neural path has to decide.
+    """
+
+    def __init__(self, responders, min_score=95, shortlist=10):
+        self.min_score = min_score
+        self.shortlist = shortlist
+        self.exact = defaultdict(dict)       # normalized key -> {intent: key}
+        self.grams = defaultdict(set)        # trigram -> normalized keys containing it
+        self.gram_count = {}                 # normalized key -> number of trigrams
+        self.hits = 0
+        self.misses = 0
+
+        for intent, responder in responders.items():
+            for key in responder.keys:
+                norm = normalize(key)
+                if not norm:
+                    continue
+                self.exact[norm][intent] = key
+                if norm not in self.gram_count:
+                    grams = char_ngrams(norm)
+                    self.gram_count[norm] = len(grams)
+                    for g in grams:
+                        self.grams[g].add(norm)
+
+    def lookup(self, text):
+        norm = normalize(text)
+        match = self.exact.get(norm)
+        if match is None and norm:
+            match = self._fuzzy(norm)
+
+        if match is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return match
+
+    def _fuzzy(self, norm):
+        # shortlist keys by trigram overlap (Jaccard), then score only those
+        grams = char_ngrams(norm)
+        overlap = defaultdict(int)
+        for g in grams:
+            for key in self.grams.get(g, ()):
+                overlap[key] += 1
+        if not overlap:
+            return None
+
+        def jaccard(key):
+            shared = overlap[key]
+            return shared / (len(grams) + self.gram_count[key] - shared)
+
+        candidates = sorted(overlap, key=jaccard, reverse=True)[:self.shortlist]
+        best_key, best_score = None, 0
+        for key in candidates:
+            score = fuzz.token_sort_ratio(norm, key)
+            if score > best_score:
+                best_key, best_score = key, score
+
+        if best_score < self.min_score:
+            return None
+        return self.exact[best_key]
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
@@ -0,0 +1,110 @@
+"""
+Plumbing shared by the long-running helper processes (browser.py, nlp_server.py):
+each one listens on a unix socket with multiprocessing.connection and is
+launched on demand by its clients.
+"""
+
+from multiprocessing.connection import Client, Listener
+import fcntl
+import os
+import subprocess
+import sys
+import time
+
+
+def alive(address, authkey):
+    try:
+        Client(address, family="AF_UNIX", authkey=authkey).close()
+        return True
+    except OSError:
+        return False
+
+
+def connect(address, authkey, timeout):
+    """Connects to the service, retrying until it is up or `timeout` runs out."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return Client(address, family="AF_UNIX", authkey=authkey)
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+def launch(address, authkey, script, args=()):
+    """
+    Starts `python script args...` unless the service is running or still
+    starting up; returns the new Popen or None. Several processes may race for
+    this (the NLP service opens the browser too), so the check and the launch
+    happen under an exclusive lock on `<address>.lock`, which also records the
+    pid of the last launch: a service that hasn't bound its socket yet is found
+    by its pid instead of being started a second time.
+    """
+    with open(address + ".lock", "a+") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        lock.seek(0)
+        pid = lock.read().strip()
+        if alive(address, authkey) or (pid.isdigit() and pid_running(int(pid), script)):
+            return None
+        process = subprocess.Popen([sys.executable, os.path.abspath(script), *args])
+        lock.seek(0)
+        lock.truncate()
+        lock.write(str(process.pid))
+        return process
+
+
+def pid_running(pid, script):
+    """True if `pid` is a live process running `script` (pids get reused)."""
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            if os.path.basename(script).encode() not in f.read():
+                return False
+        with open(f"/proc/{pid}/stat") as f:
+            # exited but not yet reaped by its parent
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except (FileNotFoundError, IndexError):
+        return False
+
+
+def listen(address, authkey):
+    """The service side: a listener on `address`, replacing a stale socket file."""
+    if os.path.exists(address):
+        os.unlink(address)
+    return Listener(address, family="AF_UNIX", authkey=authkey)
+
+
+class Connection:
+    """A client's connection to a service, reopened once (after `restart()`) when it drops."""
+
+    def __init__(self, name, address, authkey, restart, timeout):
+        self.name = name
+        self.address = address
+        self.authkey = authkey
+        self.restart = restart
+        self.timeout = timeout
+        self.conn = None
+
+    def call(self, command, reply=True):
+        """Sends `command` and returns the service's reply (None with reply=False)."""
+        for attempt in range(2):
+            try:
+                if self.conn is None:
+                    self.conn = connect(self.address, self.authkey, self.timeout)
+                self.conn.send(command)
+                return self.conn.recv() if reply else None
+            except (OSError, EOFError) as e:
+                # service died or was restarted; reconnect once before giving up
+                self.close()
+                if attempt:
+                    raise
+                print(f"WARNING: {self.name} service unreachable: {e}")
+                self.restart()
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except OSError:
+                pass
+            self.conn = None
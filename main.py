@@ -1,20 +1,83 @@
-import cv_cam
-import speech_recognition as sr
-import nlp
+import communicator
+import browser
+import nlp_server
+import startup
 import time
+import metrics
 
 target_fps = 5
 delay = 1 / target_fps
 prev_time = 0
+report_interval = 60
+prev_report = time.time()
 
+# NLP models in their own process (nlp_server.py), False loads them into this one
+NLP_SERVICE = True
+
+
+def load_nlp():
+    if NLP_SERVICE:
+        nlp_server.start()
+        # with YOLO, Vosk and the encoder loading at once the Pi can take longer
+        # than START_TIMEOUT; keep waiting (relaunching if the service died) so
+        # speech still starts once the service is up
+        while True:
+            try:
+                nlp_server.wait_ready()
+                return nlp_server
+            except OSError:
+                print(f"WARNING: NLP service not up after {nlp_server.START_TIMEOUT} s, still waiting")
+                nlp_server.start()
+    import nlp
+    nlp.watch()
+    return nlp
+
+def load_speech():
+    import speech_recognition as sr
+    return sr
+
+def load_vision():
+    import cv_cam
+    return cv_cam
+
+def load_tts():
+    import voice_output
+    voice_output.load()
+    return voice_output
+
+def start_vision(cv_cam):
+    # steers toward the primary camera's target at 50 Hz, between the 5 FPS detections
+    global steering
+    steering = communicator.SteeringController(cv_cam.primary)
+    steering.start()
 
 
 def voice_input_dispatcher(text):
-    response = nlp.run(text)
+    # an exception here would end speech_recognition's thread for good: the
+    # service raises RuntimeError for its own errors and OSError/EOFError when
+    # it can't be reached; in-process nlp can raise anything a dispatcher does
+    try:
+        response = boot["nlp"].module.run(text)
+    except Exception as e:
+        print(f"WARNING: couldn't answer '{text}': {e!r}")
+        return
     print(f"RECOGNIZED SPEECH: {text} OUTPUT: {response}")
     
    
-sr.start(voice_input_dispatcher) 
+metrics.start_exporter()
+# start the browser process now so the first map request doesn't pay for it
+browser.start()
+
+# every model loads at the same time; each part starts as soon as what it needs is loaded
+steering = None
+boot = startup.Startup()
+boot.add("nlp", load_nlp)
+boot.add("speech", load_speech, start=lambda sr: sr.start(voice_input_dispatcher), after=("nlp",))
+boot.add("vision", load_vision, start=start_vision)
+boot.add("tts", load_tts)
+boot.run()
+boot_reported = False
+vision = boot["vision"]
 
 
 print("INFO: Entering main loop")
@@ -22,13 +85,26 @@ while True:
     current_time = time.time()
     elapsed = current_time - prev_time
 
-    if elapsed > delay:
-        cv_cam.update()
+    # speech keeps being answered while YOLO is still loading
+    if elapsed > delay and vision.ready.is_set():
+        vision.module.update()
         print("tick")
         prev_time = current_time
 
+    if not boot_reported and boot.finished():
+        boot.report()
+        boot_reported = True
+
+    if current_time - prev_report > report_interval and vision.ready.is_set():
+        vision.module.report()
+        prev_report = current_time
+
+    time.sleep(0.005)
 
-sr.end()
-cv_cam.end()
-nlp.end()
 
+if steering:
+    steering.stop()
+for name in ("speech", "vision", "nlp"):
+    if boot[name].ready.is_set():
+        boot[name].module.end()
+browser.end()
@@ -0,0 +1,190 @@
+"""
+Lightweight timing spans, counters and gauges for the robot pipeline.
+
+Disabled unless NDC_METRICS=1 (or metrics.enable() is called); when disabled
+span() hands back a shared no-op object, so the instrumented code pays one
+function call. When enabled a span costs two perf_counter() calls and a
+locked histogram update (about a microsecond, see `python metrics.py`).
+
+Export, set through the environment and started by start_exporter():
+    NDC_METRICS_PORT=9105             serve Prometheus text on http://127.0.0.1:9105/metrics
+    NDC_METRICS_FILE=/path/ndc.prom   rewrite a textfile (node_exporter textfile collector)
+    NDC_METRICS_INTERVAL=10           seconds between textfile writes
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import bisect
+import os
+import threading
+import time
+
+ENABLED = os.environ.get("NDC_METRICS", "0") == "1"
+
+# seconds; covers everything from a faiss search to a Piper synthesis
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_histograms = {}   # stage -> [per-bucket counts..., +Inf count, sum]
+_counters = {}
+_gauges = {}
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start)
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def enable(enabled=True):
+    global ENABLED
+    ENABLED = enabled
+
+
+def span(name):
+    if not ENABLED:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def observe(name, seconds):
+    if not ENABLED:
+        return
+    i = bisect.bisect_left(BUCKETS, seconds)
+    with _lock:
+        h = _histograms.get(name)
+        if h is None:
+            h = _histograms[name] = [0] * (len(BUCKETS) + 2)
+        h[i] += 1
+        h[-1] += seconds
+
+
+def inc(name, value=1):
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def set_gauge(name, value):
+    if not ENABLED:
+        return
+    _gauges[name] = value
+
+
+def render():
+    lines = []
+    with _lock:
+        histograms = {k: list(v) for k, v in _histograms.items()}
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+
+    if histograms:
+        lines.append("# HELP ndc_stage_seconds Time spent in each pipeline stage.")
+        lines.append("# TYPE ndc_stage_seconds histogram")
+    for stage, h in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(BUCKETS, h):
+            cumulative += count
+            lines.append(f'ndc_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+        cumulative += h[len(BUCKETS)]
+        lines.append(f'ndc_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {cumulative}')
+        lines.append(f'ndc_stage_seconds_sum{{stage="{stage}"}} {h[-1]:.6f}')
+        lines.append(f'ndc_stage_seconds_count{{stage="{stage}"}} {cumulative}')
+
+    for name, value in sorted(counters.items()):
+        lines.append(f"# TYPE ndc_{name}_total counter")
+        lines.append(f"ndc_{name}_total {value}")
+
+    for name, value in sorted(gauges.items()):
+        lines.append(f"# TYPE ndc_{name} gauge")
+        lines.append(f"ndc_{name} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path):
+    # write-then-rename so a scraper never reads a half written file
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(render())
+    os.replace(tmp, path)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host="127.0.0.1"):
+    server = ThreadingHTTPServer((host, port), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"INFO: metrics served on http://{host}:{port}/metrics")
+    return server
+
+
+def _textfile_loop(path, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            write_textfile(path)
+        except OSError as e:
+            print(f"WARNING: couldn't write metrics to {path}: {e}")
+
+
+def start_exporter():
+    if not ENABLED:
+        return
+
+    port = os.environ.get("NDC_METRICS_PORT")
+    if port:
+        serve(int(port))
+
+    path = os.environ.get("NDC_METRICS_FILE")
+    if path:
+        interval = float(os.environ.get("NDC_METRICS_INTERVAL", "10"))
+        threading.Thread(target=_textfile_loop, args=(path, interval), daemon=True).start()
+        print(f"INFO: metrics written to {path} every {interval:g} s")
+
+
+if __name__ == "__main__":
+    # cost of one span, to compare against the stages it wraps
+    n = 200_000
+    for enabled in (False, True):
+        enable(enabled)
+        start = time.perf_counter()
+        for _ in range(n):
+            with span("overhead_check"):
+                pass
+        per_span = (time.perf_counter() - start) / n
+        print(f"enabled={enabled}: {per_span * 1e6:.2f} us per span "
+              f"({per_span / 0.2 * 100:.4f}% of a 5 FPS frame budget per span)")
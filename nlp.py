@@ -2,12 +2,16 @@ from sentence_transformers import SentenceTransformer
 from sklearn.linear_model import LogisticRegression
 from sentence_transformers import SentenceTransformer
 import joblib
-import faiss
 import numpy as np
 import csv
+import os
+import threading
 import time
 
 import browser
+import metrics
+import faiss_index
+from lexical import LexicalIndex
 
 
 class TextClassifier:
@@ -17,56 +21,190 @@ class TextClassifier:
         if clf_path:
             self.clf = joblib.load(clf_path)
     
+    def encode(self, texts):
+        with metrics.span("nlp_encode"):
+            return self.encoder.encode(texts)
+
+    def classify(self, X):
+        with metrics.span("nlp_classify"):
+            return self.clf.predict(X)
+
     def predict(self, texts):
         single_input = False
         if isinstance(texts, str):
             single_input = True
             texts = [texts]
         
-        X = self.encoder.encode(texts)
-        preds = self.clf.predict(X)
+        preds = self.classify(self.encode(texts))
         
         return preds[0] if single_input else preds
 
 
+class KnowledgeBase:
+    """One immutable snapshot of a responder's rows and index; replaced as a whole on reload."""
+
+    def __init__(self, data, key_ids, index, next_id):
+        self.data = data            # key -> answer
+        self.key_ids = key_ids      # key -> faiss id
+        self.id_keys = {i: k for k, i in key_ids.items()}
+        self.keys = list(data)
+        self.index = index
+        self.next_id = next_id
+
+
+def read_rows(csv_file):
+    rows = {}
+    with open(csv_file, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        for row in reader:
+            if len(row) >= 2:
+                key, value = row[0].strip(), row[1].strip()
+                key = key.lower()
+                rows[key] = value
+    return rows
+
+
 class InfoResponder:
-    def __init__(self, csv_file, encoder=None):
-        self.keys = []
-        self.data = {}
+    def __init__(self, csv_file, encoder=None, index_type="flat", k=1, threshold=None, fallback=None):
+        # threshold is a squared L2 distance (for "ip" it is derived from cosine
+        # similarity, see faiss_index.search); answers further away than that
+        # are replaced with `fallback`
+        self.csv_file = csv_file
         self.encoder = encoder or SentenceTransformer("all-MiniLM-L6-v2")
-        self.index = None
+        self.index_type = index_type
+        self.k = k
+        self.threshold = threshold
+        self.fallback = fallback
+        self.kb = KnowledgeBase({}, {}, None, 0)
 
         try:
-            with open(csv_file, newline='', encoding='utf-8') as f:
-                import csv
-                reader = csv.reader(f)
-                for row in reader:
-                    if len(row) >= 2:
-                        key, value = row[0].strip(), row[1].strip()
-                        key = key.lower()
-                        self.keys.append(key)
-                        self.data[key] = value
-
-            if self.keys:
-                embeddings = np.array(self.encoder.encode(self.keys), dtype='float32')
-                self.index = faiss.IndexFlatL2(embeddings.shape[1])
-                self.index.add(embeddings)
-                self.embeddings = embeddings
+            data = read_rows(csv_file)
+            if data:
+                key_ids = {key: i for i, key in enumerate(data)}
+                embeddings = np.array(self.encoder.encode(list(data)), dtype='float32')
+                index = faiss_index.build_index(embeddings, index_type, ids=list(key_ids.values()))
+                self.kb = KnowledgeBase(data, key_ids, index, len(key_ids))
         except FileNotFoundError:
             print(f"Error: File '{csv_file}' not found.")
         except Exception as e:
             print(f"Error reading CSV: {e}")
 
+    @property
+    def keys(self):
+        return self.kb.keys
+
+    @property
+    def data(self):
+        return self.kb.data
+
+    @property
+    def index(self):
+        return self.kb.index
+
+    def reload(self, data=None, encoded=None):
+        """
+        Re-reads the CSV and applies only the difference: new keys are encoded
+        and added, removed keys are deleted by id, changed answers are just
+        replaced. The update is made on a copy of the index and swapped in with
+        one assignment, so concurrent respond() calls never see a half-updated
+        knowledge base. Returns True when anything changed.
+
+        Responders that share a CSV pass the rows read once as `data`, and one
+        `encoded` dict (key -> vector, filled in here) so each key is encoded once.
+        """
+        if data is None:
+            data = read_rows(self.csv_file)
+        if encoded is None:
+            encoded = {}
+        kb = self.kb
+        if data == kb.data:
+            return False
+
+        removed = [key for key in kb.key_ids if key not in data]
+        added = [key for key in data if key not in kb.key_ids]
+
+        key_ids = {key: i for key, i in kb.key_ids.items() if key in data}
+        next_id = kb.next_id
+        for key in added:
+            key_ids[key] = next_id
+            next_id += 1
+
+        if added:
+            missing = [key for key in added if key not in encoded]
+            if missing:
+                with metrics.span("nlp_reload_encode"):
+                    encoded.update(zip(missing, self.encoder.encode(missing)))
+            embeddings = np.array([encoded[key] for key in added], dtype='float32')
+
+        index = kb.index
+        if index is not None and (removed or added):
+            index = faiss_index.copy(index)
+            if removed and not faiss_index.remove(index, [kb.key_ids[k] for k in removed]):
+                # the index can't delete (HNSW): rebuild from the stored vectors, still no re-encoding
+                kept = [i for key, i in kb.key_ids.items() if key in data]
+                index = faiss_index.build_index(faiss_index.vectors(kb.index, kept), self.index_type, ids=kept) if kept else None
+        if added:
+            added_ids = [key_ids[k] for k in added]
+            if index is None:
+                index = faiss_index.build_index(embeddings, self.index_type, ids=added_ids)
+            else:
+                faiss_index.add(index, embeddings, added_ids, self.index_type)
+
+        if not key_ids:
+            index = None
+
+        self.kb = KnowledgeBase(data, key_ids, index, next_id)
+        print(f"INFO: reloaded {self.csv_file}: +{len(added)} -{len(removed)} rows")
+        metrics.inc("nlp_reloads")
+        return True
+
+    def search(self, query, k=None):
+        """Returns up to k (key, answer, distance) tuples, nearest first."""
+        if not self.kb.index:
+            return []
+
+        with metrics.span("nlp_encode"):
+            q_vec = self.encoder.encode([query])
+        return self.search_vectors(q_vec, k)[0]
+
+    def search_vectors(self, q_vecs, k=None):
+        """search() for queries already encoded with self.encoder; one list of matches per row."""
+        kb = self.kb
+        if not kb.index:
+            return [[] for _ in q_vecs]
+
+        with metrics.span("nlp_search"):
+            D, I = faiss_index.search(kb.index, np.asarray(q_vecs, dtype='float32'),
+                                      self.index_type, k=k or self.k)
+
+        results = []
+        for dists, idxs in zip(D, I):
+            matches = []
+            for dist, idx in zip(dists, idxs):
+                if idx < 0:
+                    continue
+                if self.threshold is not None and dist > self.threshold:
+                    break
+                key = kb.id_keys[idx]
+                matches.append((key, kb.data[key], float(dist)))
+            results.append(matches)
+        return results
+
+    def answer(self, matches):
+        if not matches:
+            return self.fallback
+        return matches[0][1]
+
     def respond(self, query):
         if not self.index:
             return None
+        return self.answer(self.search(query))
 
-        q_vec = np.array([self.encoder.encode(query)], dtype='float32')
-        D, I = self.index.search(q_vec, k=1)
-
-        best_idx = I[0][0]
-        best_key = self.keys[best_idx]
-        return self.data[best_key]
+    def respond_vectors(self, q_vecs):
+        """respond() for a batch of queries already encoded with self.encoder."""
+        if not self.index:
+            return [None for _ in q_vecs]
+        return [self.answer(matches) for matches in self.search_vectors(q_vecs)]
 
 
 def fn_casual_botinfo(text : str, response : str):
@@ -82,6 +220,9 @@ def fn_help_location(text : str, response : str):
     # two cases: 1) user is trying to get to the nearest hospital/office etc, 2) asking location of a place by it's name
 
     # for case 1) we didn't impliment gps system, or planning to make bot depend on online, so we will just hard code it
+    if response is None or response == FALLBACK_RESPONSE:
+        return response
+
     if "nearest" in text or "closest" in text:
         browser.open(f"https://www.google.com/search?q={text.replace(" ", "+")}")
     else:
@@ -101,13 +242,24 @@ MODEL = TextClassifier(encoder_path="./models/motif_encoder", clf_path="./models
 encoder = MODEL.encoder
 
 
+# "flat" is exact and fastest for the CSVs we ship; switch to "hnsw" or "ivf"
+# once a knowledge base grows to tens of thousands of rows
+INDEX_TYPE = "flat"
+# squared L2 distance above which a match is considered unrelated (None = always answer)
+MATCH_THRESHOLD = None
+FALLBACK_RESPONSE = "Sorry, I don't know about that yet."
+
+def make_responder(csv_file):
+    return InfoResponder(csv_file, encoder, index_type=INDEX_TYPE,
+                         threshold=MATCH_THRESHOLD, fallback=FALLBACK_RESPONSE)
+
 RESPONDERS = {
-    "casual_botinfo"    : InfoResponder("./utils/casual_smalltalk.csv", encoder),
-    "casual_smalltalk"  : InfoResponder("./utils/casual_smalltalk.csv", encoder),
-    "info_general"      : InfoResponder("./utils/help_location.csv", encoder),
-    "help_location"     : InfoResponder("./utils/help_location.csv", encoder),
-    "help_condition"    : InfoResponder("./utils/help_condition.csv", encoder),
-    "help_emergency"    : InfoResponder("./utils/help_emergency.csv", encoder)
+    "casual_botinfo"    : make_responder("./utils/casual_smalltalk.csv"),
+    "casual_smalltalk"  : make_responder("./utils/casual_smalltalk.csv"),
+    "info_general"      : make_responder("./utils/help_location.csv"),
+    "help_location"     : make_responder("./utils/help_location.csv"),
+    "help_condition"    : make_responder("./utils/help_condition.csv"),
+    "help_emergency"    : make_responder("./utils/help_emergency.csv")
 }
 
 
@@ -120,13 +272,165 @@ DISPATCHERS = {
     "help_emergency"    : fn_help_emergency
 }
 
+# intents whose dispatcher only returns the response; when a key matches several
+# of them with the same answer, the classifier can't change the output
+PLAIN_INTENTS = {"casual_botinfo", "casual_smalltalk", "info_general", "help_condition", "help_emergency"}
+
+# utterances that (almost) exactly match a CSV key skip the second encode and faiss,
+# and the classifier too unless the key is shared by intents that behave differently
+USE_LEXICAL = True
+LEXICAL = LexicalIndex(RESPONDERS)
+
+def reload_group(csv_file, responders):
+    try:
+        data = read_rows(csv_file)
+    except Exception as e:
+        print(f"Error reloading '{csv_file}': {e}")
+        return False
+
+    changed = False
+    encoded = {}
+    for responder in responders:
+        try:
+            changed |= responder.reload(data, encoded)
+        except Exception as e:
+            print(f"Error reloading '{csv_file}': {e}")
+    return changed
+
+def reload_changed(mtimes):
+    """Reloads the responders whose CSV changed since `mtimes` (updated in place)."""
+    global LEXICAL
+    # several intents share a CSV; each responder keeps its own index, but the
+    # file is read and its new keys are encoded once for all of them
+    groups = {}
+    for responder in RESPONDERS.values():
+        groups.setdefault((responder.csv_file, id(responder.encoder)), []).append(responder)
+
+    changed = False
+    for group, responders in groups.items():
+        csv_file = group[0]
+        try:
+            mtime = os.stat(csv_file).st_mtime_ns
+        except FileNotFoundError:
+            continue
+        if mtimes.get(group, mtime) != mtime:
+            changed |= reload_group(csv_file, responders)
+        mtimes[group] = mtime
+
+    if changed:
+        LEXICAL = LexicalIndex(RESPONDERS)
+    return changed
+
+def watch_loop(interval):
+    mtimes = {}
+    reload_changed(mtimes)
+    while True:
+        time.sleep(interval)
+        reload_changed(mtimes)
+
+def watch(interval=2.0):
+    """Hot-reloads the knowledge base CSVs in the background; run() keeps serving meanwhile."""
+    threading.Thread(target=watch_loop, args=(interval,), daemon=True).start()
+    print("INFO: watching knowledge base CSVs for changes")
+
+def lexical_answer(match, tp):
+    """The answer for a lexical match once the intent is known, or None."""
+    # the key may have disappeared in a reload since LEXICAL was built
+    return RESPONDERS[tp].data.get(match[tp]) if tp in match else None
+
+def lexical_intent(match):
+    """The intent to answer a lexical match with, or None when only the classifier can tell."""
+    if len(match) == 1:
+        return next(iter(match))
+    # e.g. casual_botinfo and casual_smalltalk share a CSV and both return the answer as is
+    answers = {RESPONDERS[tp].data.get(key) for tp, key in match.items()}
+    if len(answers) == 1 and PLAIN_INTENTS.issuperset(match):
+        return next(iter(match))
+    return None
+
+def resolve_batch(texts):
+    """
+    resolve() for several texts at once: lexical hits are answered directly, the
+    rest share one encode and one classify call, and the sentence vectors are
+    reused for the knowledge base search instead of encoding every text again.
+    """
+    results = [None] * len(texts)
+    pending = []
+    for i, text in enumerate(texts):
+        with metrics.span("nlp_lexical"):
+            match = LEXICAL.lookup(text) if USE_LEXICAL else None
+        tp = None
+        if match is not None:
+            metrics.inc("nlp_lexical_hits")
+            tp = lexical_intent(match)
+            if tp is not None:
+                response = lexical_answer(match, tp)
+                if response is not None:
+                    metrics.inc("nlp_classifier_skips")
+                    results[i] = (tp, response)
+                    continue
+        # the same key can live in more than one knowledge base with different
+        # dispatchers; then the classifier decides, but the search is still skipped
+        pending.append((i, match, tp))
+
+    if not pending:
+        return results
+
+    X = MODEL.encode([texts[i] for i, _, _ in pending])
+    preds = MODEL.classify(X)
+
+    by_intent = {}
+    for (i, match, tp), pred, vec in zip(pending, preds, X):
+        tp = tp or pred
+        response = lexical_answer(match, tp) if match is not None else None
+        if response is not None:
+            results[i] = (tp, response)
+        else:
+            by_intent.setdefault(tp, []).append((i, vec))
+
+    for tp, items in by_intent.items():
+        responder = RESPONDERS[tp]
+        if responder.encoder is MODEL.encoder:
+            responses = responder.respond_vectors([vec for _, vec in items])
+        else:
+            responses = [responder.respond(texts[i]) for i, _ in items]
+        for (i, _), response in zip(items, responses):
+            results[i] = (tp, response)
+    return results
+
+def resolve(text : str):
+    return resolve_batch([text])[0]
+
 def run(text : str):
-    tp = MODEL.predict(text)
-    response = RESPONDERS[tp].respond(text)
+    with metrics.span("nlp_run"):
+        tp, response = resolve(text)
+    metrics.inc("nlp_requests")
     
-    output = DISPATCHERS[tp](text, response)
+    with metrics.span("nlp_dispatch"):
+        output = DISPATCHERS[tp](text, response)
     return output
 
+def run_batch(texts):
+    """
+    run() for several texts; the outputs are in the same order. A text whose
+    dispatcher raises gets the exception in its place, so one bad request
+    doesn't fail the others batched with it.
+    """
+    with metrics.span("nlp_run_batch"):
+        resolved = resolve_batch(texts)
+    metrics.inc("nlp_requests", len(texts))
+    metrics.set_gauge("nlp_batch_size", len(texts))
+
+    outputs = []
+    for text, (tp, response) in zip(texts, resolved):
+        try:
+            with metrics.span("nlp_dispatch"):
+                outputs.append(DISPATCHERS[tp](text, response))
+        except Exception as e:
+            metrics.inc("nlp_dispatch_errors")
+            outputs.append(e)
+    return outputs
+
 def end():
     # cleanups to be defined
     pass
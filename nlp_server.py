@@ -0,0 +1,215 @@
+"""
+Local NLP inference service shared by several clients.
+
+The service (python nlp_server.py) holds the only copy of the sentence encoder,
+classifier and faiss indexes. Requests that arrive within BATCH_WINDOW of each
+other are answered together by nlp.run_batch(), so concurrent clients share one
+encode and one classify call instead of queueing behind each other.
+
+Clients call run(text), which has the same signature and result as nlp.run();
+resolve(text) likewise mirrors nlp.resolve() (no dispatch, so no side effects).
+The dispatchers run here, not in the client: browser.open() for a location is
+called from the service process.
+"""
+
+from concurrent.futures import Future
+import os
+import queue
+import subprocess
+import threading
+import time
+
+import local_service
+import metrics
+
+ADDRESS = "/tmp/ndc_nlp.sock"
+AUTHKEY = b"ndc-nlp"
+START_TIMEOUT = 120  # loading the encoder and the faiss indexes takes a while on the Pi
+
+BATCH_WINDOW = 0.005  # s to wait for more requests after the first one of a batch
+MAX_BATCH = 32
+
+_process = None
+_local = threading.local()
+_lock = threading.Lock()
+
+
+def start(window=BATCH_WINDOW, max_batch=MAX_BATCH):
+    """Launches the NLP service if it isn't running yet; safe to call more than once."""
+    global _process
+    with _lock:
+        if _process is None or _process.poll() is not None:
+            args = [ADDRESS, "--window", str(window), "--max-batch", str(max_batch)]
+            _process = local_service.launch(ADDRESS, AUTHKEY, __file__, args) or _process
+
+
+def wait_ready(timeout=START_TIMEOUT):
+    """Blocks until the service accepts connections."""
+    local_service.connect(ADDRESS, AUTHKEY, timeout).close()
+
+
+def run(text : str):
+    """nlp.run() answered by the service; each thread keeps its own connection."""
+    return _request(("run", text))
+
+
+def resolve(text : str):
+    """nlp.resolve() answered by the service: (intent, response) without dispatching."""
+    return _request(("resolve", text))
+
+
+def stats():
+    """Request and batch counters of the service, per command."""
+    return _request(("stats",))
+
+
+def end():
+    """Stops the service (if this process started it) and closes this thread's connection."""
+    connection = getattr(_local, "connection", None)
+    if connection is not None:
+        connection.close()
+    if _process is not None and _process.poll() is None:
+        try:
+            local_service.connect(ADDRESS, AUTHKEY, timeout=1).send(("quit",))
+        except (OSError, EOFError):
+            pass
+        try:
+            _process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            _process.kill()
+
+
+def _request(command):
+    if getattr(_local, "connection", None) is None:
+        _local.connection = local_service.Connection("NLP", ADDRESS, AUTHKEY, start, START_TIMEOUT)
+    status, value = _local.connection.call(command)
+    if status == "error":
+        raise RuntimeError(f"NLP service: {value}")
+    return value
+
+
+class MicroBatcher:
+    """
+    Collects requests from the connection threads and answers them in batches on
+    one thread. `run_batch(texts)` returns one output per text, or an exception
+    instance for a text that failed; if it raises, the whole batch fails.
+    """
+
+    def __init__(self, run_batch, window=BATCH_WINDOW, max_batch=MAX_BATCH):
+        self.run_batch = run_batch
+        self.window = window
+        self.max_batch = max_batch
+        self.requests = queue.Queue()
+        self.batches = 0
+        self.answered = 0
+        self.largest = 0
+        threading.Thread(target=self.loop, daemon=True).start()
+
+    def submit(self, text):
+        future = Future()
+        self.requests.put((text, future))
+        return future
+
+    def collect(self):
+        batch = [self.requests.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self.requests.get(timeout=remaining) if remaining > 0
+                             else self.requests.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def loop(self):
+        while True:
+            batch = self.collect()
+            texts = [text for text, _ in batch]
+            try:
+                outputs = self.run_batch(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            # run_batch puts an exception in place of an item that failed on its own
+            for (_, future), output in zip(batch, outputs):
+                if isinstance(output, Exception):
+                    future.set_exception(output)
+                else:
+                    future.set_result(output)
+            self.batches += 1
+            self.answered += len(batch)
+            self.largest = max(self.largest, len(batch))
+            metrics.inc("nlp_batches")
+
+    def stats(self):
+        return {
+            "requests": self.answered,
+            "batches": self.batches,
+            "mean_batch": self.answered / self.batches if self.batches else 0.0,
+            "max_batch": self.largest,
+        }
+
+
+def serve(address=ADDRESS, window=BATCH_WINDOW, max_batch=MAX_BATCH):
+    import nlp
+
+    batchers = {
+        "run": MicroBatcher(nlp.run_batch, window, max_batch),
+        "resolve": MicroBatcher(nlp.resolve_batch, window, max_batch),
+    }
+    stop = threading.Event()
+
+    def handle(conn):
+        while True:
+            try:
+                command, *args = conn.recv()
+            except (EOFError, OSError):
+                return
+
+            try:
+                if command in batchers:
+                    conn.send(("ok", batchers[command].submit(args[0]).result()))
+                elif command == "stats":
+                    conn.send(("ok", {name: b.stats() for name, b in batchers.items()}))
+                elif command == "quit":
+                    stop.set()
+                    return
+                else:
+                    conn.send(("error", f"unknown command {command!r}"))
+            except (EOFError, OSError):
+                return
+            except Exception as e:
+                conn.send(("error", repr(e)))
+
+    def listen(listener):
+        while True:
+            conn = listener.accept()
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+    listener = local_service.listen(address, AUTHKEY)
+    threading.Thread(target=listen, args=(listener,), daemon=True).start()
+    nlp.watch()
+    print(f"INFO: NLP service ready (batch window {window * 1000:.1f} ms, max batch {max_batch})")
+
+    stop.wait()
+    listener.close()
+    nlp.end()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="NLP inference service")
+    parser.add_argument("address", nargs="?", default=ADDRESS)
+    parser.add_argument("--window", type=float, default=BATCH_WINDOW, help="batch window (s)")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH, help="1 disables batching")
+    args = parser.parse_args()
+
+    # the robot process already owns NDC_METRICS_PORT
+    port = os.environ.get("NDC_NLP_METRICS_PORT")
+    if metrics.ENABLED and port:
+        metrics.serve(int(port))
+    serve(args.address, args.window, args.max_batch)
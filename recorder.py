@@ -0,0 +1,116 @@
+"""
+Records a camera + microphone session from the robot for later replay (see replay.py).
+
+Session layout:
+    session.json     sample rate, block size, frame size, duration
+    frames/NNNNNN.jpg  camera frames
+    frames.csv       frame number, timestamp (seconds since the session start)
+    audio.raw        16 kHz mono int16 audio, blocks back to back
+    audio.csv        byte offset, byte length, timestamp of every block
+
+Run:
+    python recorder.py sessions/lobby --seconds 120
+"""
+
+import argparse
+import csv
+import json
+import os
+import threading
+import time
+
+import cv2
+import sounddevice as sd
+
+SAMPLE_RATE = 16000
+BLOCK_SIZE = 8000  # same as speech_recognition's input stream
+JPEG_QUALITY = 90
+
+
+def record(session_dir, seconds, fps=5, camera=0):
+    os.makedirs(os.path.join(session_dir, "frames"), exist_ok=True)
+
+    audio_file = open(os.path.join(session_dir, "audio.raw"), "wb")
+    audio_index = open(os.path.join(session_dir, "audio.csv"), "w", newline="")
+    audio_writer = csv.writer(audio_index)
+    audio_writer.writerow(["offset", "length", "timestamp"])
+    audio_lock = threading.Lock()
+    offset = 0
+    start = None
+
+    def callback(indata, frames, time_info, status):
+        nonlocal offset
+        data = bytes(indata)
+        with audio_lock:
+            audio_file.write(data)
+            audio_writer.writerow([offset, len(data), f"{time.monotonic() - start:.6f}"])
+            offset += len(data)
+
+    cap = cv2.VideoCapture(camera)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    stream = sd.RawInputStream(samplerate=SAMPLE_RATE, blocksize=BLOCK_SIZE, dtype='int16',
+                               channels=1, callback=callback)
+
+    frames_index = open(os.path.join(session_dir, "frames.csv"), "w", newline="")
+    frames_writer = csv.writer(frames_index)
+    frames_writer.writerow(["frame", "timestamp"])
+
+    print(f"INFO: recording {seconds} s to {session_dir}")
+    start = time.monotonic()
+    stream.start()
+    count = 0
+    next_frame = start
+    try:
+        while time.monotonic() - start < seconds:
+            ret, frame = cap.read()
+            if not ret:
+                print("COULDN'T CAPTURE FRAME'")
+                continue
+            stamp = time.monotonic() - start
+            cv2.imwrite(os.path.join(session_dir, "frames", f"{count:06d}.jpg"), frame,
+                        [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+            frames_writer.writerow([count, f"{stamp:.6f}"])
+            count += 1
+
+            next_frame += 1 / fps
+            wait = next_frame - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        duration = time.monotonic() - start
+        stream.stop()
+        stream.close()
+        cap.release()
+        frames_index.close()
+        with audio_lock:
+            audio_file.close()
+            audio_index.close()
+
+    with open(os.path.join(session_dir, "session.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "duration": duration,
+            "frames": count,
+            "width": width,
+            "height": height,
+            "fps": fps,
+            "samplerate": SAMPLE_RATE,
+            "blocksize": BLOCK_SIZE,
+        }, f, indent=2)
+    print(f"INFO: recorded {count} frames and {offset // 2} audio samples in {duration:.1f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("session_dir")
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--fps", type=float, default=5, help="frames to keep per second (cv_cam runs at 5)")
+    parser.add_argument("--camera", type=int, default=0)
+    args = parser.parse_args()
+
+    record(args.session_dir, args.seconds, args.fps, args.camera)
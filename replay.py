@@ -0,0 +1,219 @@
+"""
+Replays a session recorded with recorder.py through the real pipeline.
+
+install() swaps cv2.VideoCapture and sounddevice.RawInputStream for sources
+that read the session, so cv_cam.update() and speech_recognition.callback see
+the recorded frames and audio exactly as they saw the live devices. Both
+sources share one clock, started by Session.begin() once everything is
+loaded: speed 1 is real time, N is N x faster, 0 is as fast as possible
+(frames and audio then run independently).
+
+Unlike a live camera, a replayed one hands out the next frame only after
+cv_cam has taken the previous one (Camera.paced), so every recorded frame goes
+through update() in order and a replay is reproducible at any speed. When
+detection is slower than the replay speed, vision falls behind the clock
+instead of dropping frames.
+
+Run from the project root:
+    python replay.py sessions/lobby --speed 4
+    python replay.py sessions/lobby --speed 0 --no-speech     # max vision throughput
+"""
+
+import argparse
+import csv
+import json
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class ReplayClock:
+    def __init__(self, speed):
+        self.speed = speed
+        self.start = None
+        self.started = threading.Event()
+
+    def begin(self):
+        self.start = time.monotonic()
+        self.started.set()
+
+    def wait_until(self, timestamp):
+        """Sleeps until `timestamp` (seconds into the session) is due at the replay speed."""
+        self.started.wait()
+        if not self.speed:
+            return
+        wait = self.start + timestamp / self.speed - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+
+
+class Session:
+    def __init__(self, session_dir, speed=1.0):
+        self.dir = session_dir
+        self.clock = ReplayClock(speed)
+        with open(os.path.join(session_dir, "session.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+
+    def begin(self):
+        """Starts the replay; the sources block until then."""
+        self.clock.begin()
+
+    def frames(self):
+        with open(os.path.join(self.dir, "frames.csv"), newline="") as f:
+            return [(int(r["frame"]), float(r["timestamp"])) for r in csv.DictReader(f)]
+
+    def audio_blocks(self):
+        with open(os.path.join(self.dir, "audio.csv"), newline="") as f:
+            return [(int(r["offset"]), int(r["length"]), float(r["timestamp"])) for r in csv.DictReader(f)]
+
+
+class ReplayVideoCapture:
+    """cv2.VideoCapture replacement returning the session's frames at their recorded times."""
+
+    session = None
+    paced = True  # see cv_cam.Camera
+
+    def __init__(self, index=0, *args):
+        self.frames = self.session.frames()
+        self.position = 0
+        self.opened = True
+        self.finished = False
+
+    def isOpened(self):
+        return self.opened
+
+    def set(self, prop, value):
+        return True
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.session.meta["width"]
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.session.meta["height"]
+        if prop == cv2.CAP_PROP_FPS:
+            return self.session.meta["fps"]
+        return 0
+
+    def read(self):
+        if not self.opened or self.position >= len(self.frames):
+            self.finished = True
+            return False, None
+        number, timestamp = self.frames[self.position]
+        self.position += 1
+        self.session.clock.wait_until(timestamp)
+        frame = cv2.imread(os.path.join(self.session.dir, "frames", f"{number:06d}.jpg"))
+        return frame is not None, frame
+
+    def release(self):
+        self.opened = False
+
+
+class ReplayInputStream:
+    """sounddevice.RawInputStream replacement feeding the session's audio blocks to the callback."""
+
+    session = None
+
+    def __init__(self, samplerate=16000, blocksize=8000, dtype='int16', channels=1, callback=None, **kwargs):
+        if samplerate != self.session.meta["samplerate"]:
+            raise ValueError(f"session was recorded at {self.session.meta['samplerate']} Hz, not {samplerate}")
+        self.callback = callback
+        self.blocks = self.session.audio_blocks()
+        self.audio = np.memmap(os.path.join(self.session.dir, "audio.raw"), dtype=np.uint8, mode="r")
+        self.active = False
+        self.finished = threading.Event()
+
+    def start(self):
+        self.active = True
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        for offset, length, timestamp in self.blocks:
+            if not self.active:
+                break
+            self.session.clock.wait_until(timestamp)
+            self.callback(self.audio[offset:offset + length].tobytes(), length // 2, None, None)
+        self.finished.set()
+
+    def stop(self):
+        self.active = False
+
+    def close(self):
+        self.active = False
+
+
+def install(session_dir, speed=1.0, headless=True):
+    """Patches the camera and microphone entry points; call before importing cv_cam / speech_recognition."""
+    import sounddevice as sd
+
+    session = Session(session_dir, speed)
+    ReplayVideoCapture.session = session
+    ReplayInputStream.session = session
+    cv2.VideoCapture = ReplayVideoCapture
+    sd.RawInputStream = ReplayInputStream
+
+    if headless:
+        cv2.imshow = lambda *args, **kwargs: None
+        cv2.waitKey = lambda *args, **kwargs: -1
+        cv2.destroyAllWindows = lambda *args, **kwargs: None
+    return session
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("session_dir")
+    parser.add_argument("--speed", type=float, default=1.0, help="1 = real time, N = N x, 0 = as fast as possible")
+    parser.add_argument("--no-vision", action="store_true")
+    parser.add_argument("--no-speech", action="store_true")
+    parser.add_argument("--show", action="store_true", help="open the detection window")
+    args = parser.parse_args()
+
+    session = install(args.session_dir, args.speed, headless=not args.show)
+    print(f"INFO: replaying {session.meta['duration']:.1f} s session at speed {args.speed or 'max'}")
+
+    # load every model before the shared clock starts, so neither stream starts out behind
+    utterances = []
+    if not args.no_speech:
+        import speech_recognition as sr
+        import nlp
+    if not args.no_vision:
+        import cv_cam
+
+    if not args.no_speech:
+        def dispatcher(text):
+            response = nlp.run(text)
+            utterances.append(text)
+            print(f"RECOGNIZED SPEECH: {text} OUTPUT: {response}")
+
+        sr.start(dispatcher)
+
+    start = time.monotonic()
+    session.begin()
+    frames = 0
+    if not args.no_vision:
+        # the camera threads read the next frame only once update() took the last one
+        while True:
+            used = cv_cam.update()
+            frames += used
+            if not used:
+                if not any(cam.thread.is_alive() for cam in cv_cam.cameras.values()):
+                    break
+                time.sleep(0.001)
+    if not args.no_speech:
+        sr.stream.finished.wait()
+        while not sr.q.empty():
+            time.sleep(0.05)
+    elapsed = time.monotonic() - start
+
+    print(f"INFO: replay took {elapsed:.1f} s for {session.meta['duration']:.1f} s of session "
+          f"({session.meta['duration'] / elapsed:.2f}x real time)")
+    if frames:
+        print(f"INFO: {frames} of {session.meta['frames']} frames detected, {frames / elapsed:.2f} FPS through cv_cam.update")
+    if not args.no_speech:
+        print(f"INFO: {len(utterances)} utterances recognized")
+
+
+if __name__ == "__main__":
+    main()
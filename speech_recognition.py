@@ -4,20 +4,27 @@ import json
 import queue
 import threading
 
+import metrics
+
 model = Model("./models/vosk-model-small-en-us-0.15")
 rec = KaldiRecognizer(model, 16000)
 q = queue.Queue()
 
 def callback(indata, frames, time, status):
     q.put(bytes(indata))
+    metrics.set_gauge("speech_queue_depth", q.qsize())
 
 def recognize_loop(dispatcher):
     while True:
         data = q.get()
-        if rec.AcceptWaveform(data):
+        with metrics.span("speech_recognize"):
+            accepted = rec.AcceptWaveform(data)
+        if accepted:
             result = json.loads(rec.Result())
             if result.get("text"):
-                dispatcher(result["text"])
+                metrics.inc("speech_utterances")
+                with metrics.span("speech_dispatch"):
+                    dispatcher(result["text"])
 
 def demo_dispatcher(text):
     print(text)
@@ -0,0 +1,140 @@
+"""
+Loads the independent subsystems of the robot in parallel.
+
+Each Component loads on its own thread; model loading is mostly file I/O and
+native code (torch, Vosk, onnxruntime) that releases the GIL. The NLP models
+load in the NLP service process instead (see nlp_server.py), which also keeps
+sentence encoding from competing with the main loop for the GIL afterwards.
+
+A component's start callback runs as soon as it and the components it depends
+on have loaded, so e.g. speech is answered while YOLO is still loading.
+"""
+
+import threading
+import time
+
+import metrics
+
+
+class Component:
+    def __init__(self, name, load, start=None, after=()):
+        self.name = name
+        self.load = load
+        self.start = start
+        self.after = after
+        self.module = None
+        self.seconds = None
+        self.error = None
+        self.failed_in = None  # "load" or "start"
+        self.missing = None  # the dependency that kept it from starting
+        self.finished = None
+        self.loaded = threading.Event()
+        self.ready = threading.Event()
+        self.done = threading.Event()  # ready, or given up on
+
+    @property
+    def failed(self):
+        return self.error is not None
+
+
+class Startup:
+    def __init__(self):
+        self.components = {}
+        self.begin = None
+
+    def add(self, name, load, start=None, after=()):
+        """
+        `load` returns the loaded module (or anything else worth keeping as
+        .module); `start(module)` starts the subsystem's loop once `load` and
+        every component named in `after` have finished.
+        """
+        self.components[name] = Component(name, load, start, after)
+
+    def __getitem__(self, name):
+        return self.components[name]
+
+    def run(self):
+        """Starts every component's thread and returns immediately."""
+        self.begin = time.monotonic()
+        for component in self.components.values():
+            threading.Thread(target=self._run, args=(component,), daemon=True,
+                             name=f"startup-{component.name}").start()
+
+    def _run(self, component):
+        try:
+            self._load_and_start(component)
+        finally:
+            component.finished = time.monotonic()
+            component.done.set()
+
+    def _load_and_start(self, component):
+        start = time.monotonic()
+        try:
+            component.module = component.load()
+        except Exception as e:
+            component.error = e
+            component.failed_in = "load"
+        component.seconds = time.monotonic() - start
+        component.loaded.set()
+
+        if component.failed:
+            print(f"WARNING: {component.name} failed to load after {component.seconds:.1f} s: "
+                  f"{component.error!r}")
+            return
+        print(f"INFO: {component.name} loaded in {component.seconds:.1f} s")
+        metrics.set_gauge(f"startup_{component.name}_seconds", component.seconds)
+
+        for name in component.after:
+            dependency = self.components[name]
+            dependency.done.wait()
+            if not dependency.ready.is_set():
+                component.missing = name
+                print(f"WARNING: {component.name} not started, {name} is not available")
+                return
+
+        try:
+            if component.start:
+                component.start(component.module)
+        except Exception as e:
+            component.error = e
+            component.failed_in = "start"
+            print(f"WARNING: {component.name} failed to start: {e!r}")
+            return
+        component.ready.set()
+        print(f"INFO: {component.name} ready {time.monotonic() - self.begin:.1f} s after boot")
+
+    def finished(self):
+        """True once every component is ready or has given up."""
+        return all(component.done.is_set() for component in self.components.values())
+
+    def wait(self, timeout=None):
+        """Blocks until every component is ready or has given up; returns True when all are ready."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for component in self.components.values():
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            component.done.wait(remaining)
+        return all(component.ready.is_set() for component in self.components.values())
+
+    def report(self):
+        """Per-component load times, and the boot time saved over loading one after another."""
+        total = 0.0
+        for component in self.components.values():
+            if component.seconds is None:
+                print(f"INFO: startup {component.name:<8} still loading")
+                continue
+            total += component.seconds
+            if component.ready.is_set():
+                state = f"loaded in {component.seconds:6.1f} s, ready at {component.finished - self.begin:.1f} s"
+            elif component.failed_in == "load":
+                state = f"failed to load after {component.seconds:.1f} s"
+            elif component.failed_in == "start":
+                state = f"loaded in {component.seconds:6.1f} s, failed to start"
+            elif component.missing:
+                state = f"loaded in {component.seconds:6.1f} s, not started ({component.missing} not available)"
+            else:
+                state = f"loaded in {component.seconds:6.1f} s, starting"
+            print(f"INFO: startup {component.name:<8} {state}")
+
+        if self.finished():
+            elapsed = max(component.finished for component in self.components.values()) - self.begin
+            print(f"INFO: startup took {elapsed:.1f} s; loading one after another: {total:.1f} s")
@@ -0,0 +1,215 @@
+"""
+Classifier sweep for the motif (intent) model.
+
+Trains several candidate classifiers in parallel over precomputed sentence
+embeddings, measures their accuracy and predict latency (one utterance and a
+batch), and exports the fastest model that is accurate enough to the path
+nlp.TextClassifier loads from, refitted on the whole dataset (the report keeps
+the held-out scores).
+
+Run from the project root:
+    python utils/sweep_motif_classifier.py              # --refresh re-encodes the dataset
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import json
+import os
+import time
+
+from sentence_transformers import SentenceTransformer
+from sklearn.base import clone
+from sklearn.decomposition import PCA
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+from sklearn.neighbors import NearestCentroid
+from sklearn.pipeline import make_pipeline
+from sklearn.svm import LinearSVC
+import pandas as pd
+import joblib
+import numpy as np
+
+
+DATASET_PATH = "./datasets/train/motif_dataset_large.csv"
+ENCODER_PATH = "./models/motif_encoder"
+EMBEDDINGS_PATH = "./models/motif_embeddings.npz"
+CLASSIFIER_PATH = "./models/motif_classifier.pkl"
+REPORT_PATH = "./models/motif_classifier_report.json"
+
+# selection rule: among candidates whose single-utterance predict latency fits
+# the budget and whose accuracy is within MAX_ACCURACY_DROP of the best one,
+# export the fastest
+LATENCY_BUDGET_MS = 2.0
+MAX_ACCURACY_DROP = 0.01
+
+SINGLE_REPEATS = 200
+BATCH_SIZE = 64
+BATCH_REPEATS = 20
+
+
+def make_candidates():
+    candidates = {}
+    for c in (0.1, 1.0, 10.0):
+        candidates[f"logreg_C{c}"] = LogisticRegression(C=c, max_iter=2000)
+    for c in (0.1, 1.0):
+        candidates[f"linear_svm_C{c}"] = LinearSVC(C=c)
+    candidates["nearest_centroid"] = NearestCentroid()
+    for n in (32, 64, 128):
+        candidates[f"pca{n}_logreg"] = make_pipeline(PCA(n_components=n, random_state=42),
+                                                     LogisticRegression(max_iter=2000))
+        candidates[f"pca{n}_nearest_centroid"] = make_pipeline(PCA(n_components=n, random_state=42),
+                                                               NearestCentroid())
+    return candidates
+
+
+def encoder_path():
+    # must be the same encoder nlp.TextClassifier uses at runtime
+    return ENCODER_PATH if os.path.isdir(ENCODER_PATH) else "all-MiniLM-L6-v2"
+
+
+def embeddings_source():
+    """What the cached vectors were made from; any change means they must be re-encoded."""
+    dataset = os.stat(DATASET_PATH)
+    path = encoder_path()
+    encoder_mtime = 0
+    if os.path.isdir(path):
+        # retraining overwrites the files inside the encoder directory
+        for root, _, files in os.walk(path):
+            for name in files:
+                encoder_mtime = max(encoder_mtime, os.stat(os.path.join(root, name)).st_mtime_ns)
+    return {
+        "dataset": DATASET_PATH,
+        "dataset_mtime": dataset.st_mtime_ns,
+        "dataset_size": dataset.st_size,
+        "encoder": path,
+        "encoder_mtime": encoder_mtime,
+    }
+
+
+def load_embeddings(refresh=False):
+    """Encode the dataset once and cache the vectors, so the sweep never touches the encoder."""
+    source = embeddings_source()
+    if os.path.exists(EMBEDDINGS_PATH) and not refresh:
+        cached = np.load(EMBEDDINGS_PATH, allow_pickle=True)
+        cached_source = json.loads(str(cached["source"])) if "source" in cached.files else None
+        if cached_source == source:
+            print(f"Loading cached embeddings from {EMBEDDINGS_PATH}")
+            return cached["X"], cached["y"]
+        print(f"WARNING: {EMBEDDINGS_PATH} is stale (dataset or encoder changed), re-encoding")
+
+    df = pd.read_csv(DATASET_PATH)
+    print(f"Loaded {len(df)} samples with {df['label'].nunique()} classes")
+
+    print(f"Encoding dataset with {source['encoder']}...")
+    encoder = SentenceTransformer(source["encoder"])
+    X = np.asarray(encoder.encode(df["text"].tolist(), show_progress_bar=True), dtype="float32")
+    y = df["label"].to_numpy()
+
+    np.savez(EMBEDDINGS_PATH, X=X, y=y, source=json.dumps(source))
+    return X, y
+
+
+def measure_latency(clf, X):
+    single = X[:1]
+    clf.predict(single)  # warm up
+
+    start = time.perf_counter()
+    for i in range(SINGLE_REPEATS):
+        clf.predict(X[i % len(X)][None, :])
+    single_ms = (time.perf_counter() - start) / SINGLE_REPEATS * 1000
+
+    batch = X[:BATCH_SIZE]
+    start = time.perf_counter()
+    for _ in range(BATCH_REPEATS):
+        clf.predict(batch)
+    batch_ms = (time.perf_counter() - start) / BATCH_REPEATS * 1000
+
+    return single_ms, batch_ms
+
+
+def evaluate(name, clf, X_train, y_train, X_test, y_test):
+    start = time.perf_counter()
+    clf.fit(X_train, y_train)
+    fit_s = time.perf_counter() - start
+
+    accuracy = accuracy_score(y_test, clf.predict(X_test))
+    single_ms, batch_ms = measure_latency(clf, X_test)
+
+    return clf, {
+        "name": name,
+        "accuracy": float(accuracy),
+        "fit_s": fit_s,
+        "single_ms": single_ms,
+        "batch_ms": batch_ms,
+        "batch_size": BATCH_SIZE,
+    }
+
+
+def select(results):
+    best_accuracy = max(r["accuracy"] for r in results)
+    eligible = [
+        r for r in results
+        if r["accuracy"] >= best_accuracy - MAX_ACCURACY_DROP and r["single_ms"] <= LATENCY_BUDGET_MS
+    ]
+    if not eligible:
+        print(f"WARNING: no candidate within {LATENCY_BUDGET_MS} ms; falling back to the most accurate one")
+        return max(results, key=lambda r: r["accuracy"])
+    return min(eligible, key=lambda r: r["single_ms"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--refresh", action="store_true", help="re-encode the dataset even if the cache looks current")
+    args = parser.parse_args()
+
+    X, y = load_embeddings(args.refresh)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42, stratify=y
+    )
+
+    candidates = make_candidates()
+    print(f"Sweeping {len(candidates)} candidates...")
+
+    models = {}
+    results = []
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as pool:
+        futures = [
+            pool.submit(evaluate, name, clf, X_train, y_train, X_test, y_test)
+            for name, clf in candidates.items()
+        ]
+        for future in futures:
+            clf, result = future.result()
+            models[result["name"]] = clf
+            results.append(result)
+            print(f"{result['name']:<28} acc={result['accuracy']:.4f}  "
+                  f"single={result['single_ms']:.3f} ms  batch{BATCH_SIZE}={result['batch_ms']:.3f} ms")
+
+    # the workers ran side by side; re-time each model alone so the numbers
+    # used for selection are not skewed by contention
+    for result in results:
+        result["single_ms"], result["batch_ms"] = measure_latency(models[result["name"]], X_test)
+
+    chosen = select(results)
+    print(f"\nSelected {chosen['name']} (acc={chosen['accuracy']:.4f}, single={chosen['single_ms']:.3f} ms)")
+
+    # the split was only for scoring; the exported model learns from every sample
+    final = clone(candidates[chosen["name"]])
+    final.fit(X, y)
+    joblib.dump(final, CLASSIFIER_PATH)
+    with open(REPORT_PATH, "w", encoding="utf-8") as f:
+        json.dump({
+            "selected": chosen["name"],
+            "latency_budget_ms": LATENCY_BUDGET_MS,
+            "max_accuracy_drop": MAX_ACCURACY_DROP,
+            "train_samples": int(len(y_train)),
+            "test_samples": int(len(y_test)),
+            "exported_fit_samples": int(len(y)),
+            "candidates": sorted(results, key=lambda r: r["single_ms"]),
+        }, f, indent=2)
+
+    print(f"Classifier saved to {CLASSIFIER_PATH}, report saved to {REPORT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
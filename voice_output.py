@@ -1,20 +1,41 @@
+import threading
+
 import numpy as np
 import sounddevice as sd
 from piper.voice import PiperVoice
 
+import metrics
+
 model_path = "./voices/en_GB-alan-medium.onnx"
 
-def speak(text):
-    voice = PiperVoice.load(model_path)
+_voice = None
+_lock = threading.Lock()
+
+def load():
+    """Loads the Piper voice on the first call; later calls return the same voice."""
+    global _voice
+    with _lock:
+        if _voice is None:
+            with metrics.span("tts_load"):
+                _voice = PiperVoice.load(model_path)
+    return _voice
+
+def synthesize(text):
+    voice = load()
     chunks = []
-    for chunk in voice.synthesize(text):
-        chunks.append(chunk.audio_int16_bytes)
+    with metrics.span("tts_synthesis"):
+        for chunk in voice.synthesize(text):
+            chunks.append(chunk.audio_int16_bytes)
 
 
     all_bytes = b"".join(chunks)
     audio = np.frombuffer(all_bytes, dtype=np.int16)
+    return audio, voice.config.sample_rate
+
 
-    sd.play(audio, samplerate=voice.config.sample_rate)
+def speak(text):
+    audio, sample_rate = synthesize(text)
+    sd.play(audio, samplerate=sample_rate)
 
 
 if __name__ == "__main__":